@@ -0,0 +1,85 @@
+"""add composite indexes for inbox, chat and routing queries
+
+Revision ID: 3f9a1c7d2b64
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b64'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) -- must match __table_args__ in app/models.py
+INDEXES = [
+    (
+        "ix_users_role_college_department_status",
+        "users",
+        ["role", "college_name", "department_name", "access_status"],
+    ),
+    ("ix_leave_requests_hod_created", "leave_requests", ["hod_id", "created_at", "id"]),
+    ("ix_leave_requests_student_created", "leave_requests", ["student_id", "created_at", "id"]),
+    ("ix_messages_pair_created", "messages", ["sender_id", "receiver_id", "created_at"]),
+    ("ix_certificate_requests_hod_status", "certificate_requests", ["hod_id", "overall_status"]),
+    ("ix_certificate_requests_vp_status", "certificate_requests", ["vp_id", "overall_status"]),
+    (
+        "ix_certificate_requests_principal_status",
+        "certificate_requests",
+        ["principal_id", "overall_status"],
+    ),
+    (
+        "ix_certificate_requests_student_created",
+        "certificate_requests",
+        ["student_id", "created_at", "id"],
+    ),
+    (
+        "ix_certificate_requests_status_created",
+        "certificate_requests",
+        ["overall_status", "created_at"],
+    ),
+    (
+        "ix_certificate_approvals_request_approver",
+        "certificate_approvals",
+        ["request_id", "approver_id"],
+    ),
+    (
+        "ix_custom_letter_requests_receiver_created",
+        "custom_letter_requests",
+        ["receiver_id", "created_at", "id"],
+    ),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and it
+    # does not block writes on the tables while the index builds.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,28 @@
+"""add link column to messages
+
+Revision ID: b71d0e3a9c25
+Revises: 8c2e5b1f4a90
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d0e3a9c25'
+down_revision: Union[str, Sequence[str], None] = '8c2e5b1f4a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("messages", sa.Column("link", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("messages", "link")
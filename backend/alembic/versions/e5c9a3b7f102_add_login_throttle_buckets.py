@@ -0,0 +1,37 @@
+"""add login_throttle_buckets
+
+Revision ID: e5c9a3b7f102
+Revises: d4a7f2c81e36
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c9a3b7f102'
+down_revision: Union[str, Sequence[str], None] = 'd4a7f2c81e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Throttle state is disposable: UNLOGGED skips the WAL, and a crash
+    # only resets the buckets.
+    op.create_table(
+        "login_throttle_buckets",
+        sa.Column("key", sa.String(length=330), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("refilled_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+        prefixes=["UNLOGGED"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("login_throttle_buckets")
@@ -0,0 +1,44 @@
+"""add refresh_sessions
+
+Revision ID: f2b8d6e4a913
+Revises: e5c9a3b7f102
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6e4a913'
+down_revision: Union[str, Sequence[str], None] = 'e5c9a3b7f102'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "refresh_sessions",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("generation", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_refresh_sessions_user_id"), "refresh_sessions", ["user_id"]
+    )
+    op.create_index(
+        op.f("ix_refresh_sessions_expires_at"), "refresh_sessions", ["expires_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_refresh_sessions_expires_at"), table_name="refresh_sessions")
+    op.drop_index(op.f("ix_refresh_sessions_user_id"), table_name="refresh_sessions")
+    op.drop_table("refresh_sessions")
@@ -1,3 +1,106 @@
+import os
+
 JWT_SECRET_KEY = "CHANGE_THIS_SECRET_KEY_IN_PRODUCTION"
 JWT_ALGORITHM = "HS256"
-JWT_EXPIRE_MINUTES = 60
\ No newline at end of file
+JWT_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "15"))
+
+# Refresh tokens renew the short-lived access token without a password.
+# A session expires after this many days without use (each refresh
+# extends it); see app/services/refresh_tokens.py.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+# Upper bound on how long a worker may serve a stale approver directory
+# when another worker changed it.
+ROUTING_CACHE_TTL_SECONDS = int(os.getenv("ROUTING_CACHE_TTL_SECONDS", "300"))
+
+# When enabled, read-only endpoints trust the role / college / department /
+# access_status claims in the JWT instead of loading the user. Changes to
+# those fields then only take effect when the token is re-issued.
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Short-lived cache of user snapshots used by read-only endpoints.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# How notifications reach users connected to other workers:
+# "memory" (single worker) or "postgres" (LISTEN/NOTIFY, any number of workers).
+NOTIFICATION_BROKER = os.getenv("NOTIFICATION_BROKER", "memory")
+
+# Per-socket outbound notification queue. When a client falls this far
+# behind, "drop_oldest" discards its oldest pending event and "close"
+# disconnects it (the client reconnects and refetches).
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100"))
+NOTIFICATION_OVERFLOW_POLICY = os.getenv("NOTIFICATION_OVERFLOW_POLICY", "drop_oldest")
+NOTIFICATION_SEND_TIMEOUT_SECONDS = float(os.getenv("NOTIFICATION_SEND_TIMEOUT_SECONDS", "10"))
+
+# Outbox dispatcher: rows handled per transaction, and how often idle
+# workers poll for events written by other workers.
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+
+# Letter templates are compiled once; their files are re-checked for
+# changes at most this often.
+TEMPLATE_RELOAD_CHECK_SECONDS = float(os.getenv("TEMPLATE_RELOAD_CHECK_SECONDS", "5"))
+
+# Rendered letters / verification payloads kept in memory per worker.
+# Within the fresh window a cached copy is served without any query.
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RENDER_CACHE_FRESH_SECONDS = float(os.getenv("RENDER_CACHE_FRESH_SECONDS", "10"))
+
+# max-age of GET responses that are the same for every caller
+# (college list, letter verification); see app/services/http_cache.py
+HTTP_CACHE_PUBLIC_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_PUBLIC_MAX_AGE_SECONDS", "60"))
+
+# GET /colleges/ is served from memory; entries are dropped on college or
+# approver changes, the TTL bounds staleness across workers.
+COLLEGE_DIRECTORY_TTL_SECONDS = int(os.getenv("COLLEGE_DIRECTORY_TTL_SECONDS", "300"))
+
+# Signature uploads: largest accepted file, read/write chunk size and
+# how many uploads may write to disk at once.
+SIGNATURE_MAX_BYTES = int(os.getenv("SIGNATURE_MAX_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+UPLOAD_IO_WORKERS = int(os.getenv("UPLOAD_IO_WORKERS", "4"))
+
+# Stored signatures are downscaled to fit this box at upload time.
+SIGNATURE_MAX_WIDTH = int(os.getenv("SIGNATURE_MAX_WIDTH", "1200"))
+SIGNATURE_MAX_HEIGHT = int(os.getenv("SIGNATURE_MAX_HEIGHT", "400"))
+
+# Where uploaded files live: "local" (files under STORAGE_LOCAL_ROOT) or
+# "s3" (any S3-compatible bucket, e.g. MinIO, shared by every node).
+# Objects are named by content hash; unreferenced ones younger than
+# STORAGE_GC_GRACE_SECONDS are never deleted.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "uploads")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_REGION = os.getenv("S3_REGION") or None
+STORAGE_GC_GRACE_SECONDS = int(os.getenv("STORAGE_GC_GRACE_SECONDS", "3600"))
+
+# PDFs of approved letters / certificates are drawn by this many worker
+# processes and kept under PDF_CACHE_DIR per document version.
+# PDF_FONT_PATH may point at a TTF for names outside Latin-1.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "cache/pdf")
+PDF_FONT_PATH = os.getenv("PDF_FONT_PATH") or None
+
+# Password hashing runs on its own process pool. BCRYPT_ROUNDS is the
+# cost factor; hashes made with another cost are redone at next login.
+# Past PASSWORD_HASH_MAX_PENDING queued hashes, callers wait up to
+# PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS and then get a 503.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Failed sign-ins are rate limited per email and per client address with
+# token buckets: CAPACITY failures in a row, then one more every
+# REFILL_SECONDS. "memory" keeps buckets per worker, "postgres" shares
+# them between workers. The same wrong password for an email is
+# answered from memory for LOGIN_FAILURE_CACHE_SECONDS.
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_THROTTLE_EMAIL_CAPACITY = int(os.getenv("LOGIN_THROTTLE_EMAIL_CAPACITY", "5"))
+LOGIN_THROTTLE_EMAIL_REFILL_SECONDS = float(os.getenv("LOGIN_THROTTLE_EMAIL_REFILL_SECONDS", "60"))
+LOGIN_THROTTLE_IP_CAPACITY = int(os.getenv("LOGIN_THROTTLE_IP_CAPACITY", "50"))
+LOGIN_THROTTLE_IP_REFILL_SECONDS = float(os.getenv("LOGIN_THROTTLE_IP_REFILL_SECONDS", "6"))
+LOGIN_FAILURE_CACHE_SECONDS = float(os.getenv("LOGIN_FAILURE_CACHE_SECONDS", "300"))
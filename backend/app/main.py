@@ -1,27 +1,86 @@
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import List, Optional
 
 
 import jwt
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, FastAPI, HTTPException, status, Form
-from passlib.context import CryptContext
+from fastapi import Depends, FastAPI, HTTPException, status, Form, Query, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from app.services.message_service import send_system_message
-from sqlalchemy import or_, and_
+from app.services.batch_decisions import DecisionBatch, load_for_update
+from app.services.message_service import chat_message_payload, fetch_conversation
+from app.services.outbox import (
+    outbox_dispatcher,
+    queue_notification,
+    queue_system_message,
+)
+from app.services.inbox_service import InvalidCursor, fetch_inbox_page
+from app.services.letter_templates import leave_template_version, render_leave_body
+from app.services.render_cache import (
+    cached_document,
+    record_version,
+    render_cache,
+    serve_cached,
+    user_version,
+    user_version_columns,
+)
+from app.services import http_cache
+from app.services.http_cache import etag_matches, weak_etag
+from app.services.login_throttle import Throttled, login_throttle
+from app.services.passwords import HasherBusy, hash_password, password_hasher
+from app.services.pdf_documents import NotPrintable, pdf_renderer
+from app.services.refresh_tokens import (
+    REFRESH_TOKEN_TYPE,
+    InvalidRefreshToken,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
+from app.services.college_directory import college_directory
+from app.services.routing_directory import routing_directory
+from app.services.workflow import (
+    CERTIFICATE_WORKFLOW,
+    WORKFLOWS,
+    TransitionNotAllowed,
+)
+from app.services.signature_images import (
+    SIGNATURE_NAME,
+    VARIANTS,
+    collect_signature_garbage,
+    release_signature,
+    signature_variant,
+    store_signature,
+)
+from app.services.storage import PATH_PREFIX
+from app.services.uploads import (
+    InvalidUpload,
+    UploadTooLarge,
+    save_image_upload,
+)
+from app.services.user_cache import UserSnapshot, user_cache
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from PIL import UnidentifiedImageError
+from pypdf import PdfWriter
+import io
+import json
+import math
 import os
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi import File, UploadFile
-import uuid
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
 
 from .websocket.notifications import manager, get_current_user_ws
 from fastapi import WebSocket, WebSocketDisconnect
-from .config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRE_MINUTES
+from .config import (
+    AUTH_TRUST_TOKEN_CLAIMS,
+    JWT_ALGORITHM,
+    JWT_EXPIRE_MINUTES,
+    JWT_SECRET_KEY,
+)
 
 from enum import Enum
 
@@ -34,19 +93,18 @@ class LetterType(str, Enum):
 
 from . import models, schemas
 
-from app.models import (
-    LeaveRequest,
-    LeaveApproval,
-    CertificateRequest,
-    CertificateApproval,
-    CustomLetterRequest,
+from .database import (
+    AsyncSessionLocal,
+    Base,
+    engine,
+    get_async_db,
+    get_db,
+    pool_metrics,
 )
-from .database import Base, engine, get_db
 
 from fastapi.middleware.cors import CORSMiddleware
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 
@@ -58,6 +116,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Has-More"],
 )
 
 os.makedirs("uploads/signatures", exist_ok=True)
@@ -66,10 +125,7 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.User:
+def decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(
             token,
@@ -77,7 +133,8 @@ def get_current_user(
             algorithms=[JWT_ALGORITHM],
         )
         user_id = payload.get("sub")
-        if not user_id:
+        # refresh tokens are only good at /auth/refresh
+        if not user_id or payload.get("typ") == REFRESH_TOKEN_TYPE:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token",
@@ -93,7 +150,33 @@ def get_current_user(
             detail="Invalid token",
         )
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    return payload
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> models.User:
+    payload = decode_access_token(token)
+
+    user = db.query(models.User).filter(models.User.id == int(payload["sub"])).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> models.User:
+    """get_current_user for `async def` handlers using an AsyncSession."""
+    payload = decode_access_token(token)
+
+    user = await db.get(models.User, int(payload["sub"]))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,6 +186,37 @@ def get_current_user(
     return user
 
 
+def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> UserSnapshot:
+    """
+    Lightweight caller identity for read-only endpoints.
+
+    Uses the token claims when AUTH_TRUST_TOKEN_CLAIMS is on, otherwise a
+    cached snapshot of the user row. The database is only hit on a cache
+    miss, so most requests skip the users lookup entirely.
+    """
+    payload = decode_access_token(token)
+
+    if AUTH_TRUST_TOKEN_CLAIMS and "access_status" in payload:
+        return UserSnapshot.from_claims(payload)
+
+    user_id = int(payload["sub"])
+    snapshot = user_cache.get(user_id)
+    if snapshot:
+        return snapshot
+
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+
+    return user_cache.put(UserSnapshot.from_user(user))
+
+
 
 @app.on_event("startup")
 def on_startup() -> None:
@@ -110,12 +224,45 @@ def on_startup() -> None:
     Base.metadata.create_all(bind=engine)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+@app.on_event("startup")
+async def start_notifications() -> None:
+    await manager.start()
+    await outbox_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_notifications() -> None:
+    await outbox_dispatcher.stop()
+    await manager.stop()
+
+
+@app.on_event("shutdown")
+def stop_worker_pools() -> None:
+    pdf_renderer.shutdown()
+    password_hasher.shutdown()
+
+
+def _hasher_busy(exc: HasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": "1"},
+    )
+
+
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy as exc:
+        raise _hasher_busy(exc)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    """(matches, replacement hash when the cost factor changed)."""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy as exc:
+        raise _hasher_busy(exc)
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -123,12 +270,19 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
 
 
 def create_jwt_for_user(user: models.User) -> str:
-    """Create a very simple JWT containing the user id, email and role."""
+    """
+    Create a JWT containing the user id plus the profile fields that
+    read-only endpoints need (see get_current_principal).
+    """
     expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRE_MINUTES)
     payload = {
         "sub": str(user.id),
         "email": user.email,
+        "name": user.name,
         "role": user.role,
+        "college_name": user.college_name,
+        "department_name": user.department_name,
+        "access_status": user.access_status,
         "exp": expire,
     }
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
@@ -136,16 +290,18 @@ def create_jwt_for_user(user: models.User) -> str:
 
 
 @app.post("/users/", response_model=schemas.AuthResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
     department_name: str = Form(None),
     signature: UploadFile = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    existing = get_user_by_email(db, email)
+    existing = (
+        await db.scalars(select(models.User).where(models.User.email == email))
+    ).first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -167,25 +323,9 @@ def create_user(
                 detail="Signature is required for this role.",
             )
 
-        if signature.content_type not in ["image/png", "image/jpeg"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only PNG or JPG images are allowed",
-            )
-
-        upload_dir = "uploads/signatures"
-        os.makedirs(upload_dir, exist_ok=True)
-
-        file_ext = signature.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        file_path = os.path.join(upload_dir, filename)
-
-        with open(file_path, "wb") as buffer:
-            buffer.write(signature.file.read())
+        signature_path = await save_signature(signature)
 
-        signature_path = file_path
-
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
 
     user = models.User(
         name=name,
@@ -197,18 +337,45 @@ def create_user(
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.flush()
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+    await db.refresh(user)
+    login_throttle.forget(email)
 
     jwt_token = create_jwt_for_user(user)
 
     return schemas.AuthResponse(
         message="Signup successful",
         jwt_token=jwt_token,
+        refresh_token=refresh_token,
         user=user,
     )
 
 
+async def save_signature(file: UploadFile) -> str:
+    """Store an uploaded signature image; 400 / 413 on a bad upload."""
+    if file.content_type not in ["image/png", "image/jpeg"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PNG or JPG images are allowed",
+        )
+
+    try:
+        path = await save_image_upload(file)
+        return await store_signature(path)
+    except UploadTooLarge as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc),
+        )
+    except InvalidUpload as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
+
+
 # create Admin
 def create_default_admin(db: Session):
     existing_admin = (
@@ -220,7 +387,7 @@ def create_default_admin(db: Session):
     if existing_admin:
         return
 
-    hashed_password = pwd_context.hash("password123")
+    hashed_password = hash_password("password123")
 
     admin_user = models.User(
         name="administrator",
@@ -347,6 +514,9 @@ def register_college(
 
     db.commit()
     db.refresh(principal)
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(principal.id)
 
     return schemas.CollegeOut(
         id=college.id,
@@ -399,6 +569,9 @@ def request_vice_principal_access(
     
     db.commit()
     db.refresh(user)
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(user.id)
 
     return user
 
@@ -449,6 +622,9 @@ def request_superintendent_access(
 
     db.commit()
     db.refresh(user)
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(user.id)
 
     return user
 
@@ -489,6 +665,9 @@ def request_hod_access(
     
     db.commit()
     db.refresh(user)
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(user.id)
 
     return user
 
@@ -529,41 +708,125 @@ def request_student_access(
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user.id)
 
     return user
 
 
 @app.post("/auth/login", response_model=schemas.AuthResponse)
-def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = get_user_by_email(db, credentials.email)
+async def login(
+    credentials: schemas.LoginRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Throttled callers are turned away before any user lookup or hash
+    client_ip = request.client.host if request.client else None
+    try:
+        await login_throttle.check(credentials.email, client_ip)
+    except Throttled as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed sign-in attempts. Please try again later.",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        )
+
+    matches, new_hash = False, None
+    user = None
+    if not login_throttle.known_failure(credentials.email, credentials.password):
+        user = (
+            await db.scalars(
+                select(models.User).where(models.User.email == credentials.email)
+            )
+        ).first()
+
+        if user:
+            matches, new_hash = await verify_password(
+                credentials.password, user.hashed_password
+            )
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not matches:
+        await login_throttle.failed(
+            credentials.email, client_ip, credentials.password
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
 
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        user.hashed_password = new_hash
+        await db.commit()
+
     if user.access_status != "approved":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Your account is not yet approved. Please contact admin.",
         )
 
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+
     jwt_token = create_jwt_for_user(user)
 
     return schemas.AuthResponse(
         message="Login successful",
         jwt_token=jwt_token,
+        refresh_token=refresh_token,
         user=user,
     )
 
 
+@app.post("/auth/refresh", response_model=schemas.TokenPair)
+async def refresh_tokens(
+    body: schemas.RefreshRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    New access + refresh token for a refresh token: no password check,
+    one UPDATE, and the access token carries the user's current profile.
+    Each refresh token works once.
+    """
+    try:
+        rotated = await rotate_refresh_token(db, body.refresh_token)
+    except InvalidRefreshToken as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc))
+    await db.commit()
+
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session expired, please sign in again",
+        )
+
+    user, refresh_token = rotated
+    user_cache.put(user)
+    return schemas.TokenPair(
+        jwt_token=create_jwt_for_user(user),
+        refresh_token=refresh_token,
+    )
+
+
+@app.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: schemas.RefreshRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        await revoke_refresh_token(db, body.refresh_token)
+    except InvalidRefreshToken:
+        # nothing to revoke
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 
 @app.post("/leaves/", response_model=schemas.LeaveOut, status_code=201)
 async def create_leave_request(
     leave_in: schemas.LeaveCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "student":
         raise HTTPException(
@@ -584,15 +847,8 @@ async def create_leave_request(
         )
 
     # 🔍 Find HOD of same department & college
-    hod = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "hod",
-            models.User.department_name == current_user.department_name,
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    hod = await routing_directory.ahod(
+        db, current_user.college_name, current_user.department_name
     )
 
     if not hod:
@@ -618,10 +874,11 @@ async def create_leave_request(
     )
 
     db.add(leave)
-    db.commit()
-    db.refresh(leave)
+    await db.flush()
 
-    await manager.notify(
+    # 🔔 Delivered by the outbox dispatcher once this commit lands
+    queue_notification(
+        db,
         hod.id,
         {
             "title": "New Leave Request",
@@ -631,22 +888,33 @@ async def create_leave_request(
         }
     )
 
-
     request_link = f"/leaves/{leave.id}"
 
-    send_system_message(
-        db=db,
-        sender_id=current_user.id,
-        receiver_id=hod.id,
-        text=f"I have submitted a leave request.",
-    )
-    send_system_message(
-        db=db,
+    queue_system_message(
+        db,
         sender_id=current_user.id,
         receiver_id=hod.id,
-        text=request_link,
+        text="I have submitted a leave request.",
+        link=request_link,
     )
 
+    await db.commit()
+    outbox_dispatcher.wake()
+
+    # Reload with the people LeaveOut serializes; lazy loads are not
+    # available on an AsyncSession.
+    leave = (
+        await db.execute(
+            select(models.LeaveRequest)
+            .options(
+                joinedload(models.LeaveRequest.student),
+                joinedload(models.LeaveRequest.hod),
+            )
+            .where(models.LeaveRequest.id == leave.id)
+            .execution_options(populate_existing=True)
+        )
+    ).scalar_one()
+
     return leave
 
 
@@ -735,8 +1003,10 @@ def hod_dashboard_leaves(
 @app.get("/leaves/{leave_id}", response_model=schemas.LeaveOut)
 def get_leave_request(
     leave_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ):
     leave = (
         db.query(models.LeaveRequest)
@@ -754,6 +1024,20 @@ def get_leave_request(
             detail="Leave request not found",
         )
 
+    not_modified = http_cache.conditional(
+        request,
+        response,
+        etag=weak_etag(
+            leave.updated_at,
+            leave.overall_status,
+            leave.hod.signature_path if leave.hod else None,
+        ),
+        last_modified=leave.updated_at,
+        policy=http_cache.PRIVATE,
+    )
+    if not_modified:
+        return not_modified
+
     return leave
 
 @app.put("/leaves/{leave_id}/status", response_model=schemas.LeaveOut)
@@ -868,114 +1152,123 @@ def list_leave_messages(leave_id: int, db: Session = Depends(get_db)):
     return messages
 
 
-@app.get("/leaves/{leave_id}/letter")
-def get_leave_letter(leave_id: int, db: Session = Depends(get_db)):
-    leave = db.query(models.LeaveRequest).filter(models.LeaveRequest.id == leave_id).first()
-    if not leave:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Leave request not found",
-        )
-
-    student = db.query(models.User).filter(models.User.id == leave.student_id).first()
-    if not student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student user not found",
-        )
+def _leave_letter_version(updated_at, leave_type: str, *student) -> str:
+    return record_version(updated_at, leave_type, leave_template_version(leave_type), *student)
 
-    body = render_leave_body(
-        leave_type=leave.leave_type,
-        student_name=student.name,
-        reason=leave.reason,
-        from_date=str(leave.from_date),
-        to_date=str(leave.to_date),
-    )
-    return {"letter": body}
 
-@app.get("/colleges/", response_model=List[schemas.CollegeOut])
-def list_colleges(db: Session = Depends(get_db)):
-    colleges = db.query(models.College).all()
-    result = []
-
-    for c in colleges:
-        vp = (
-            db.query(models.User)
-            .filter(
-                models.User.role == "vice_principal",
-                models.User.college_name == c.name,
-                models.User.access_status == "approved",
+@app.get("/leaves/{leave_id}/letter")
+def get_leave_letter(leave_id: int, request: Request, db: Session = Depends(get_db)):
+    def current_version():
+        student = aliased(models.User)
+        row = db.execute(
+            select(
+                models.LeaveRequest.updated_at,
+                models.LeaveRequest.leave_type,
+                *user_version_columns(student),
             )
+            .outerjoin(student, student.id == models.LeaveRequest.student_id)
+            .where(models.LeaveRequest.id == leave_id)
+        ).first()
+        return _leave_letter_version(*row) if row else None
+
+    def render():
+        leave = (
+            db.query(models.LeaveRequest)
+            .options(joinedload(models.LeaveRequest.student))
+            .filter(models.LeaveRequest.id == leave_id)
             .first()
         )
+        if not leave:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Leave request not found",
+            )
 
-        result.append({
-            "id": c.id,
-            "name": c.name,
-            "address": c.address,
-            "city": c.city,
-            "zip_code": c.zip_code,
-            "departments": c.departments,
-            "principal_name": c.principal.name,
-            "principal_email": c.principal.email,
-            "vice_principal_name": vp.name if vp else None,
-            "vice_principal_email": vp.email if vp else None,
-        })
+        student = leave.student
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Student user not found",
+            )
 
-    return result
+        body = render_leave_body(
+            leave_type=leave.leave_type,
+            student_name=student.name,
+            reason=leave.reason,
+            from_date=str(leave.from_date),
+            to_date=str(leave.to_date),
+        )
+        version = _leave_letter_version(leave.updated_at, leave.leave_type, *user_version(student))
+        return version, {"letter": body}
 
+    # Served from the render cache (or as a 304) while the leave is unchanged
+    return serve_cached(request, ("letter", "leave", leave_id), current_version, render)
 
 
-def render_leave_body(
-    leave_type: str,
-    student_name: str,
-    reason: Optional[str],
-    from_date: str,
-    to_date: str,
-) -> str:
+@app.post("/leaves/letters", response_model=List[schemas.LeaveLetterOut])
+def render_leave_letters(
+    data: schemas.LeaveLetterBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_principal),
+):
     """
-    Very simple text-template renderer using the .txt files in /templates.
-    The templates can use the following placeholders:
-      {student_name}, {reason}, {from_date}, {to_date}
+    Letter bodies for several leaves at once (e.g. to pre-render a list).
+    Leaves the user is neither the student nor the HOD of are left out.
     """
-    templates_dir = Path(__file__).resolve().parent.parent / "templates"
-    template_map = {
-        "emergency": "leave_emergency.txt",
-        "medical": "leave_medical.txt",
-        "personal": "leave_personal.txt",
-        "wedding": "leave_wedding.txt",
-    }
+    leave_ids = list(dict.fromkeys(data.leave_ids))
 
-    template_name = template_map.get(leave_type.lower())
-    # If we do not find a template, use a simple generic body.
-    if not template_name:
-        return (
-            f"Dear Sir/Madam,\n\n"
-            f"I, {student_name}, request leave from {from_date} to {to_date}.\n"
-            f"Reason: {reason or 'N/A'}.\n\n"
-            f"Thank you.\n"
+    leaves = (
+        db.query(models.LeaveRequest)
+        .options(joinedload(models.LeaveRequest.student))
+        .filter(
+            models.LeaveRequest.id.in_(leave_ids),
+            or_(
+                models.LeaveRequest.student_id == current_user.id,
+                models.LeaveRequest.hod_id == current_user.id,
+            ),
         )
+        .all()
+    )
+    by_id = {leave.id: leave for leave in leaves}
 
-    template_path = templates_dir / template_name
-    if not template_path.exists():
-        return (
-            f"Dear Sir/Madam,\n\n"
-            f"I, {student_name}, request leave from {from_date} to {to_date}.\n"
-            f"Reason: {reason or 'N/A'}.\n\n"
-            f"Thank you.\n"
-        )
+    letters = []
+    for leave_id in leave_ids:
+        leave = by_id.get(leave_id)
+        if not leave:
+            continue
+        letters.append({
+            "leave_id": leave.id,
+            "letter": render_leave_body(
+                leave_type=leave.leave_type,
+                student_name=leave.student.name,
+                reason=leave.reason,
+                from_date=str(leave.from_date),
+                to_date=str(leave.to_date),
+            ),
+        })
+
+    return letters
+
+@app.get("/colleges/", response_model=List[schemas.CollegeOut])
+def list_colleges(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    # Served from memory; no query until a college or approver changes
+    directory = college_directory.get(db)
 
-    # Read the template exactly as it is in the folder.
-    content = template_path.read_text(encoding="utf-8")
+    not_modified = http_cache.conditional(
+        request,
+        response,
+        etag=directory.etag,
+        policy=http_cache.PUBLIC,
+    )
+    if not_modified:
+        return not_modified
 
-    # The current templates use {{from_date}} style placeholders.
-    # We replace those placeholders with real values, without changing the files.
-    content = content.replace("{{from_date}}", from_date)
-    content = content.replace("{{to_date}}", to_date)
-    content = content.replace("{{reason}}", reason or "")
-    content = content.replace("{{student_name}}", student_name)
+    return directory.colleges
 
-    return content
 
 
 @app.post(
@@ -986,8 +1279,8 @@ def render_leave_body(
 )
 async def create_certificate_request(
     data: schemas.CertificateRequestCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "student":
         raise HTTPException(
@@ -1019,15 +1312,8 @@ async def create_certificate_request(
         )
 
     # 🔍 Find HOD
-    hod = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "hod",
-            models.User.college_name == current_user.college_name,
-            models.User.department_name == current_user.department_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    hod = await routing_directory.ahod(
+        db, current_user.college_name, current_user.department_name
     )
 
     if not hod:
@@ -1036,25 +1322,20 @@ async def create_certificate_request(
             detail="HOD not found for your department",
         )
     # 🔍 Find Vice Principal
-    vp = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "vice_principal",
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    vp = await routing_directory.acollege_approver(
+        db, current_user.college_name, "vice_principal"
     )
 
-    # 🔍 Find Principal
-    principal = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "principal",
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
+    # the HOD forwards every certificate request to the vice principal
+    if not vp:
+        raise HTTPException(
+            status_code=400,
+            detail="Vice Principal not found for your college",
         )
-        .first()
+
+    # 🔍 Find Principal
+    principal = await routing_directory.acollege_approver(
+        db, current_user.college_name, "principal"
     )
 
     if not principal:
@@ -1076,21 +1357,15 @@ async def create_certificate_request(
     )
 
     db.add(request)
-    db.commit()
-    db.refresh(request)
+    await db.flush()
     request_link = f"/certificate-requests/{request.id}"
 
-    send_system_message(
-        db=db,
-        sender_id=current_user.id,
-        receiver_id=hod.id,
-        text=f"I have submitted a certificate request.",
-    )
-    send_system_message(
-        db=db,
+    queue_system_message(
+        db,
         sender_id=current_user.id,
         receiver_id=hod.id,
-        text=request_link,
+        text="I have submitted a certificate request.",
+        link=request_link,
     )
 
     # 📝 Create first approval (HOD)
@@ -1103,9 +1378,9 @@ async def create_certificate_request(
     
 
     db.add(approval)
-    db.commit()
 
-    await manager.notify(
+    queue_notification(
+        db,
         hod.id,
         {
             "title": "New Certificate Request",
@@ -1115,6 +1390,11 @@ async def create_certificate_request(
         }
     )
 
+    # Request, first approval and its notifications commit together
+    await db.commit()
+    await db.refresh(request)
+    outbox_dispatcher.wake()
+
     return schemas.CertificateCreateOut(
     id=request.id,
     student_id=request.student_id,
@@ -1131,8 +1411,8 @@ async def create_certificate_request(
 )
 async def create_custom_letter(
     data: schemas.CustomLetterCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "student":
         raise HTTPException(
@@ -1153,14 +1433,8 @@ async def create_custom_letter(
         )
 
     # 🔍 Resolve receiver based on role
-    receiver = (
-        db.query(models.User)
-        .filter(
-            models.User.role == data.to_role.lower(),
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    receiver = await routing_directory.acollege_approver(
+        db, current_user.college_name, data.to_role.lower()
     )
 
     if not receiver:
@@ -1179,9 +1453,9 @@ async def create_custom_letter(
     )
 
     db.add(letter)
-    db.commit()
-    db.refresh(letter)
-    await manager.notify(
+    await db.flush()
+    queue_notification(
+        db,
         receiver.id,
         {
             "title": "New Request Letter",
@@ -1192,19 +1466,17 @@ async def create_custom_letter(
     )
     request_link = f"/custom-letters/{letter.id}"
 
-    send_system_message(
-        db=db,
+    queue_system_message(
+        db,
         sender_id=current_user.id,
         receiver_id=receiver.id,
         text="I have submitted a request letter.",
+        link=request_link,
     )
 
-    send_system_message(
-        db=db,
-        sender_id=current_user.id,
-        receiver_id=receiver.id,
-        text=request_link,
-    )
+    await db.commit()
+    await db.refresh(letter)
+    outbox_dispatcher.wake()
 
     return letter
 
@@ -1212,8 +1484,10 @@ async def create_custom_letter(
 @app.get("/custom-letters/{letter_id}")
 def get_custom_letter(
     letter_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ):
     letter = (
     db.query(models.CustomLetterRequest)
@@ -1231,6 +1505,16 @@ def get_custom_letter(
     if current_user.id not in (letter.student_id, letter.receiver_id):
         raise HTTPException(403, "Not authorized to view this letter")
 
+    not_modified = http_cache.conditional(
+        request,
+        response,
+        etag=weak_etag(letter.updated_at, letter.status, letter.receiver.signature_path),
+        last_modified=letter.updated_at,
+        policy=http_cache.PRIVATE,
+    )
+    if not_modified:
+        return not_modified
+
     return {
         "id": letter.id,
         "student_id": letter.student_id,
@@ -1256,35 +1540,13 @@ def get_custom_letter(
 
 
 @app.post("/certificate-requests/{request_id}/approve")
-def approve_certificate_request(
+async def approve_certificate_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
 ):
-    if current_user.role != "principal":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to approve certificate requests",
-        )
-
-    cert_request = (
-        db.query(models.CertificateRequest)
-        .filter(models.CertificateRequest.id == request_id)
-        .first()
-    )
-
-    if not cert_request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Certificate request not found",
-        )
-
-
-
-    cert_request.overall_status = "approved"
-    cert_request.principal_updated_at = datetime.utcnow()
-
-    db.commit()
+    await _move(db, "certificate", "approve", current_user, request_id)
+    await db.commit()
 
     return {
         "message": "Certificate request approved successfully",
@@ -1327,6 +1589,8 @@ def update_college(
 
     db.commit()
     db.refresh(college)
+    routing_directory.invalidate()
+    college_directory.invalidate()
 
     return college
 
@@ -1335,7 +1599,7 @@ def update_college(
 # accept and reject access requests
 @app.get("/access/pending", response_model=List[schemas.UserProfile])
 def get_pending_access_requests(
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     # 🔐 Strict admin check
@@ -1380,6 +1644,9 @@ def approve_access_request(
 
     user.access_status = "approved"
     db.commit()
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(user.id)
 
     return {"message": "Access approved"}
 
@@ -1411,251 +1678,107 @@ def reject_access_request(
     user.department_name = None
 
     db.commit()
+    routing_directory.invalidate()
+    college_directory.invalidate()
+    user_cache.invalidate(user.id)
 
     return {"message": "Access rejected"}
 
+
+@app.post("/access/decisions", response_model=schemas.BatchDecisionOut)
+async def decide_access_requests(
+    body: schemas.BatchDecisionRequest,
+    current_user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Approve or reject many pending access requests in one transaction."""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Only admin can approve or reject requests",
+        )
+    if body.action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="Unsupported action")
+
+    batch = DecisionBatch(body.ids)
+    users = await load_for_update(
+        db,
+        select(models.User).where(models.User.id.in_(batch.ids)),
+        of=models.User,
+    )
+
+    for user_id in batch.ids:
+        row = users.get(user_id)
+        if row is None:
+            batch.fail(user_id, 404, "User not found")
+            continue
+        user = row[0]
+        if user.access_status != "pending":
+            batch.fail(user_id, 400, "Request is not pending")
+            continue
+
+        if body.action == "approve":
+            user.access_status = "approved"
+        else:
+            user.access_status = "rejected"
+            user.college_name = None
+            user.department_name = None
+        batch.done(user_id, user.access_status)
+
+    await db.commit()
+    if batch.succeeded:
+        routing_directory.invalidate()
+        college_directory.invalidate()
+        for user_id in batch.succeeded:
+            user_cache.invalidate(user_id)
+
+    return batch.result()
+
 @app.get("/requests", response_model=List[schemas.UnifiedRequestOut])
 def get_all_requests(
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    type: Optional[LetterType] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: UserSnapshot = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    results = []
-    role = current_user.role
-    user_id = current_user.id
-
-    # =========================
-    # STUDENT
-    # =========================
-    if role == "student":
-        leaves = (
-            db.query(models.LeaveRequest)
-            .filter(models.LeaveRequest.student_id == user_id)
-            .all()
-        )
-
-        for leave in leaves:
-            results.append({
-                "id": leave.id,
-                "sender": current_user.name,
-                "type": "Leave",
-                "subject": leave.subject,
-                "created_at": leave.created_at,
-                "overall_status": leave.overall_status,
-                "view_url": f"/leaves/{leave.id}",
-            })
-
-        certificates = (
-            db.query(models.CertificateRequest)
-            .filter(models.CertificateRequest.student_id == user_id)
-            .all()
-        )
-
-        for cert in certificates:
-            results.append({
-                "id": cert.id,
-                "sender": current_user.name,
-                "type": "Certificate",
-                "subject": "Certificate Request",
-                "created_at": cert.created_at,
-                "overall_status": cert.overall_status,
-                "view_url": f"/certificate-requests/{cert.id}",
-            })
-
-        letters = (
-            db.query(models.CustomLetterRequest)
-            .filter(models.CustomLetterRequest.student_id == user_id)
-            .all()
-        )
-
-        for letter in letters:
-            results.append({
-                "id": letter.id,
-                "sender": letter.student.name,
-                "type": "Custom Letter",
-                "subject": f"Letter to {letter.to_role}",
-                "created_at": letter.created_at,
-                "overall_status": letter.status,
-                "view_url": f"/custom-letters/{letter.id}",
-            })
-
-    # =========================
-    # HOD
-    # =========================
-    elif role == "hod":
-        leaves = (
-            db.query(models.LeaveRequest)
-            .filter(models.LeaveRequest.hod_id == user_id)
-            .all()
-        )
-
-        for leave in leaves:
-            results.append({
-                "id": leave.id,
-                "sender": leave.student.name,
-                "type": "Leave",
-                "subject": leave.subject,
-                "created_at": leave.created_at,
-                "overall_status": leave.overall_status,
-                "view_url": f"/leaves/{leave.id}",
-            })
-
-        certificates = (
-            db.query(models.CertificateRequest)
-            .filter(models.CertificateRequest.hod_id == user_id)
-            .all()
-        )
-
-        for cert in certificates:
-            results.append({
-                "id": cert.id,
-                "sender": cert.student.name,
-                "type": "Certificate",
-                "subject": "Certificate Request",
-                "created_at": cert.created_at,
-                "overall_status": cert.overall_status,
-                "view_url": f"/certificate-requests/{cert.id}",
-            })
-
-        letters = (
-            db.query(models.CustomLetterRequest)
-            .filter(models.CustomLetterRequest.receiver_id == user_id)
-            .all()
-        )
-
-        for letter in letters:
-            results.append({
-                "id": letter.id,
-                "sender": letter.student.name,
-                "type": "Custom Letter",
-                "subject": f"Letter to {letter.to_role}",
-                "created_at": letter.created_at,
-                "overall_status": letter.status,
-                "view_url": f"/custom-letters/{letter.id}",
-            })
-
-    # =========================
-    # PRINCIPAL
-    # =========================
-    elif role == "principal":
-        certificates = (
-            db.query(models.CertificateRequest)
-            .filter(models.CertificateRequest.principal_id == user_id,
-            models.CertificateRequest.overall_status.in_(["forwarded_to_principal", "approved"]),)
-            .all()
-        )
-
-        for cert in certificates:
-            results.append({
-                "id": cert.id,
-                "sender": cert.student.name,
-                "type": "Certificate",
-                "subject": "Certificate Request",
-                "created_at": cert.created_at,
-                "overall_status": cert.overall_status,
-                "view_url": f"/certificate-requests/{cert.id}",
-            })
-
-        letters = (
-            db.query(models.CustomLetterRequest)
-            .filter(models.CustomLetterRequest.receiver_id == user_id)
-            .all()
-        )
-
-        for letter in letters:
-            results.append({
-                "id": letter.id,
-                "sender": letter.student.name,
-                "type": "Custom Letter",
-                "subject": f"Letter to {letter.to_role}",
-                "created_at": letter.created_at,
-                "overall_status": letter.status,
-                "view_url": f"/custom-letters/{letter.id}",
-            })
-    elif role == "superintendent":
-        certificates = (
-            db.query(models.CertificateRequest)
-            .filter(
-            models.CertificateRequest.overall_status.in_(["approved","collected","delivery_initiated"]),)
-            .all()
-        )
-
-        for cert in certificates:
-            results.append({
-                "id": cert.id,
-                "sender": cert.student.name,
-                "type": "Certificate",
-                "subject": "Certificate Request",
-                "created_at": cert.created_at,
-                "overall_status": cert.overall_status,
-                "view_url": f"/certificate-requests/{cert.id}",
-            })
-
-        letters = (
-            db.query(models.CustomLetterRequest)
-            .filter(models.CustomLetterRequest.receiver_id == user_id)
-            .all()
-        )
-
-        for letter in letters:
-            results.append({
-                "id": letter.id,
-                "sender": letter.student.name,
-                "type": "Custom Letter",
-                "subject": f"Letter to {letter.to_role}",
-                "created_at": letter.created_at,
-                "overall_status": letter.status,
-                "view_url": f"/custom-letters/{letter.id}",
-            })
-    # =========================
-    # VICE PRINCIPAL
-    # =========================
-    elif role == "vice_principal":
-        letters = (
-            db.query(models.CustomLetterRequest)
-            .filter(models.CustomLetterRequest.receiver_id == user_id)
-            .all()
-        )
-
-        for letter in letters:
-            results.append({
-                "id": letter.id,
-                "sender": letter.student.name,
-                "type": "Custom Letter",
-                "subject": f"Letter to {letter.to_role}",
-                "created_at": letter.created_at,
-                "overall_status": letter.status,
-                "view_url": f"/custom-letters/{letter.id}",
-            })
-
-        certificates = (
-            db.query(models.CertificateRequest)
-            .filter(models.CertificateRequest.vp_id == user_id,
-                    models.CertificateRequest.overall_status.in_(["forwarded_to_vp", "forwarded_to_principal"]),)
-            .all()
-        )
-
-        for cert in certificates:
-            results.append({
-                "id": cert.id,
-                "sender": cert.student.name,
-                "type": "Certificate",
-                "subject": "Certificate Request",
-                "created_at": cert.created_at,
-                "overall_status": cert.overall_status,
-                "view_url": f"/certificate-requests/{cert.id}",
-            })
-
-    # =========================
-    # SORT (Newest first)
-    # =========================
-    results.sort(key=lambda x: x["created_at"], reverse=True)
-    return results
+    """
+    Unified inbox for the current user, newest first.
+
+    - limit: page size
+    - cursor: value of the previous page's X-Next-Cursor header
+    - type: only "leave", "certificate" or "custom" requests
+    - status: only requests with this overall status
+    """
+    try:
+        items, next_cursor = fetch_inbox_page(
+            db=db,
+            user=current_user,
+            limit=limit,
+            cursor=cursor,
+            kind=type.value if type else None,
+            status=status_filter,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return items
 
 @app.get("/certificate-requests/{request_id}")
 def get_certificate_request(
     request_id: int,
+    http_request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ):
     request = (
         db.query(models.CertificateRequest)
@@ -1673,6 +1796,21 @@ def get_certificate_request(
     if not request:
         raise HTTPException(status_code=404, detail="Certificate request not found")
 
+    not_modified = http_cache.conditional(
+        http_request,
+        response,
+        etag=weak_etag(
+            request.updated_at,
+            request.overall_status,
+            *(u.signature_path if u else None
+              for u in (request.hod, request.vp, request.principal)),
+        ),
+        last_modified=request.updated_at,
+        policy=http_cache.PRIVATE,
+    )
+    if not_modified:
+        return not_modified
+
     return {
         "id": request.id,
 
@@ -1757,89 +1895,56 @@ class DecisionSchema(BaseModel):
     remarks: Optional[str] = None
 
 
-@app.post("/certificate-requests/{request_id}/forward")
-async def forward_certificate_request(
-    request_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-):
-    if current_user.role not in ["hod", "vice_principal"]:
-        raise HTTPException(
-            status_code=403,
-            detail="You are not allowed to forward this request",
-        )
+_DECISION_ACTIONS = {"approved": "approve", "rejected": "reject"}
 
-    cert_request = (
-        db.query(models.CertificateRequest)
-        .filter(models.CertificateRequest.id == request_id)
-        .first()
-    )
-
-    if not cert_request:
-        raise HTTPException(
-            status_code=404,
-            detail="Certificate request not found",
-        )
 
-    approval = (
-        db.query(models.CertificateApproval)
-        .filter(
-            models.CertificateApproval.request_id == request_id,
-            models.CertificateApproval.approver_id == current_user.id,
-        )
-        .first()
-    )
+async def _move(db: AsyncSession, kind: str, action: str, user, record_id: int, remarks: Optional[str] = None):
+    """
+    Apply a workflow transition to one request and queue its
+    notification; raises the HTTP error of a refused transition.
+    """
+    batch = DecisionBatch([record_id])
+    try:
+        moved = await WORKFLOWS[kind].apply(db, action, user, batch, remarks)
+    except TransitionNotAllowed as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
 
-    if not approval:
-        raise HTTPException(
-            status_code=400,
-            detail="Approval record not found for this user",
-        )
-    # 🔁 ROLE-BASED FLOW
-    if current_user.role == "hod":
-        cert_request.overall_status = "forwarded_to_vp"
-        cert_request.hod_updated_at = datetime.utcnow()
+    outcome = batch.result()["results"][0]
+    if not outcome["ok"]:
+        raise HTTPException(status_code=outcome["status_code"], detail=outcome["detail"])
 
-        approval.status = "forwarded"
-        approval.acted_at = datetime.utcnow()
+    batch.queue_notifications(db, actor=user.name)
+    return moved[record_id]
 
-        next_approver_id = cert_request.vp_id
-        next_role = "vice_principal"
 
-    elif current_user.role == "vice_principal":
-        cert_request.overall_status = "forwarded_to_principal"
-        cert_request.vp_updated_at = datetime.utcnow()
+async def _move_many(db: AsyncSession, kind: str, body: schemas.BatchDecisionRequest, user) -> dict:
+    """Bulk version of _move: one statement for all ids, a result per id."""
+    batch = DecisionBatch(body.ids)
+    try:
+        await WORKFLOWS[kind].apply(db, body.action, user, batch, body.remarks)
+    except TransitionNotAllowed as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
 
-        approval.status = "forwarded"
-        approval.acted_at = datetime.utcnow()
+    batch.queue_notifications(db, actor=user.name)
+    await db.commit()
+    if batch.succeeded:
+        outbox_dispatcher.wake()
 
-        next_approver_id = cert_request.principal_id
-        next_role = "principal"
+    return batch.result()
 
-    approval.acted_at = datetime.utcnow()
 
-    # 📝 Create next approval record
-    next_approval = models.CertificateApproval(
-        request_id=cert_request.id,
-        approver_id=next_approver_id,
-        approver_role=next_role,
-        status="pending",
-    )
-
-    db.add_all([approval, next_approval])
-    db.commit()
-
-    # 🔔 Notify next approver
-    await manager.notify(
-        next_approver_id,
-        {
-            "title": "Certificate Request Awaiting Approval",
-            "message": f"{current_user.name} forwarded a certificate request",
-            "type": "CERTIFICATE_FORWARDED",
-            "request_id": cert_request.id,
-        }
-    )
+@app.post("/certificate-requests/{request_id}/forward")
+async def forward_certificate_request(
+    request_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    transition = CERTIFICATE_WORKFLOW.transition("forward", current_user.role)
+    await _move(db, "certificate", "forward", current_user, request_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
+    next_role = transition.next_approver[0]
     return {
         "message": f"Certificate forwarded to {next_role.replace('_', ' ').title()}"
     }
@@ -1849,57 +1954,12 @@ async def forward_certificate_request(
 @app.post("/certificate-requests/{request_id}/reject")
 async def reject_certificate_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-
-    cert_request = (
-        db.query(models.CertificateRequest)
-        .filter(models.CertificateRequest.id == request_id)
-        .first()
-    )
-
-    if not cert_request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Certificate request not found",
-        )
-
-    approval = (
-        db.query(models.CertificateApproval)
-        .filter(
-            models.CertificateApproval.request_id == request_id,
-            models.CertificateApproval.approver_role == current_user.role,
-            models.CertificateApproval.approver_id == current_user.id,
-        )
-        .first()
-    )
-
-    if not approval:
-        raise HTTPException(
-            status_code=400,
-            detail="Approval record not found for this user",
-        )
-
-
-    approval.status = "rejected"
-    approval.acted_at = datetime.utcnow()
-    cert_request.overall_status = "rejected"
-
-    db.commit()
-    print("ACTIVE WS CONNECTIONS:", manager.active_connections.keys())
-    print("CERT REQUEST STUDENT ID:", cert_request.student_id)
-
-    # 🔔 Notify Student
-    await manager.notify(
-        cert_request.student_id,
-        {
-            "title": "Certificate Request Rejected",
-            "message": "Your certificate request was rejected",
-            "type": "CERTIFICATE_REJECTED",
-            "request_id": cert_request.id,
-        }
-    )
+    await _move(db, "certificate", "reject", current_user, request_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
     return {
         "message": "Certificate request rejected successfully",
@@ -1907,78 +1967,60 @@ async def reject_certificate_request(
     }
 
 
-@app.post("/leaves/{leave_id}/decision")
-def decide_leave_request(
-    leave_id: int,
-    payload: DecisionSchema,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+@app.post("/certificate-requests/decisions", response_model=schemas.BatchDecisionOut)
+async def decide_certificate_requests(
+    body: schemas.BatchDecisionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    if current_user.role not in ["hod", "vice_principal", "principal"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    leave = db.query(LeaveRequest).filter_by(id=leave_id).first()
-    if not leave:
-        raise HTTPException(status_code=404, detail="Leave request not found")
+    """
+    Forward (HOD / vice principal), approve (principal) or reject many
+    certificate requests of the caller at once.
+    """
+    return await _move_many(db, "certificate", body, current_user)
 
-    if leave.overall_status != "in_progress":
-        raise HTTPException(status_code=400, detail="Request already decided")
 
-    approval = LeaveApproval(
-        leave_id=leave.id,
-        approver_id=current_user.id,
-        approver_role=current_user.role,
-        status=payload.status,
-        remarks=payload.remarks,
-        acted_at=datetime.utcnow(),
-    )
 
-    leave.overall_status = payload.status
+@app.post("/leaves/{leave_id}/decision")
+async def decide_leave_request(
+    leave_id: int,
+    payload: DecisionSchema,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
+):
+    action = _DECISION_ACTIONS.get(payload.overall_status)
+    if action is None:
+        raise HTTPException(status_code=400, detail="Decision must be approved or rejected")
 
-    db.add(approval)
-    db.commit()
+    await _move(db, "leave", action, current_user, leave_id, payload.remarks)
+    await db.commit()
+    outbox_dispatcher.wake()
 
-    return {"message": f"Leave request {payload.status}"}
+    return {"message": f"Leave request {payload.overall_status}"}
 
 @app.post("/certificate-requests/{request_id}/decision")
-def decide_certificate_request(
+async def decide_certificate_request(
     request_id: int,
     payload: DecisionSchema,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
 ):
-    if current_user.role not in ["hod", "vice_principal", "principal"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    action = _DECISION_ACTIONS.get(payload.overall_status)
+    if action is None:
+        raise HTTPException(status_code=400, detail="Decision must be approved or rejected")
 
-    req = db.query(CertificateRequest).filter_by(id=request_id).first()
-    if not req:
-        raise HTTPException(status_code=404, detail="Certificate request not found")
-
-    if req.overall_status != "in_progress":
-        raise HTTPException(status_code=400, detail="Request already decided")
+    await _move(db, "certificate", action, current_user, request_id, payload.remarks)
+    await db.commit()
+    outbox_dispatcher.wake()
 
-    approval = CertificateApproval(
-        request_id=req.id,
-        approver_id=current_user.id,
-        approver_role=current_user.role,
-        status=payload.status,
-        remarks=payload.remarks,
-        acted_at=datetime.utcnow(),
-    )
-
-    req.overall_status = payload.status
-
-    db.add(approval)
-    db.commit()
-
-    return {"message": f"Certificate request {payload.status}"}
+    return {"message": f"Certificate request {payload.overall_status}"}
 
 
 @app.post("/messages", status_code=201)
-def send_message(
+async def send_message(
     data: schemas.MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
     msg = models.Message(
         sender_id=current_user.id,
@@ -1987,82 +2029,62 @@ def send_message(
     )
 
     db.add(msg)
-    db.commit()
-    db.refresh(msg)
+    await db.commit()
+
+    # 🔔 Push to the receiver so an open chat can append it in place
+    await manager.notify(data.receiver_id, chat_message_payload(msg))
 
     return msg
 
 @app.get("/messages/{other_user_id}")
 def get_messages(
     other_user_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    since_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ):
-    messages = (
-        db.query(models.Message)
-        .filter(
-            or_(
-                and_(
-                    models.Message.sender_id == current_user.id,
-                    models.Message.receiver_id == other_user_id,
-                ),
-                and_(
-                    models.Message.sender_id == other_user_id,
-                    models.Message.receiver_id == current_user.id,
-                ),
-            )
-        )
-        .order_by(models.Message.created_at)
-        .all()
-    )
-    
-
-    return messages 
+    """
+    Conversation with another user, oldest first.
 
+    - before: older messages than this message id ("load earlier")
+    - after / since_id: only messages newer than this id
+    X-Has-More tells whether another page exists in that direction.
+    """
+    after = after if after is not None else since_id
 
-@app.post("/leaves/{leave_id}/reject")
-async def reject_leave_request(
-    leave_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    if current_user.role != "hod":
+    if before is not None and after is not None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to reject leave requests",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before or after/since_id, not both",
         )
 
-    leave = (
-        db.query(LeaveRequest)
-        .filter(LeaveRequest.id == leave_id)
-        .first()
+    messages, has_more = fetch_conversation(
+        db=db,
+        user_id=current_user.id,
+        other_user_id=other_user_id,
+        limit=limit,
+        before=before,
+        after=after,
     )
 
-    if not leave:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Leave request not found",
-        )
+    response.headers["X-Has-More"] = "true" if has_more else "false"
 
-    if leave.overall_status != "in_progress":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Leave request already decided",
-        )
+    return messages
 
-    leave.overall_status = "rejected"
-    leave.approver_id = current_user.id
 
-    db.commit()
-    await manager.notify(
-        leave.student_id,
-        {
-            "title": "Leave Request Rejected",
-            "message": "Your leave request has been rejected by the HOD",
-            "type": "LEAVE_REJECTED",
-            "request_id": leave.id,
-        }
-    )
+@app.post("/leaves/{leave_id}/reject")
+async def reject_leave_request(
+    leave_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
+):
+    await _move(db, "leave", "reject", current_user, leave_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
     return {
         "message": "Leave request rejected successfully",
@@ -2072,46 +2094,12 @@ async def reject_leave_request(
 @app.post("/leaves/{leave_id}/approve")
 async def approve_leave_request(
     leave_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
 ):
-    if current_user.role != "hod":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to approve leave requests",
-        )
-
-    leave = (
-        db.query(LeaveRequest)
-        .filter(LeaveRequest.id == leave_id)
-        .first()
-    )
-
-    if not leave:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Leave request not found",
-        )
-
-    if leave.overall_status != "in_progress":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Leave request already decided",
-        )
-
-    leave.overall_status = "approved"
-    leave.approver_id = current_user.id
-
-    db.commit()
-    await manager.notify(
-        leave.student_id,
-        {
-            "title": "Leave Request Approved",
-            "message": "Your leave request has been approved by the HOD",
-            "type": "LEAVE_APPROVED",
-            "request_id": leave.id,
-        }
-    )
+    await _move(db, "leave", "approve", current_user, leave_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
     return {
         "message": "Leave request approved successfully",
@@ -2119,56 +2107,26 @@ async def approve_leave_request(
     }
 
 
+@app.post("/leaves/decisions", response_model=schemas.BatchDecisionOut)
+async def decide_leave_requests(
+    body: schemas.BatchDecisionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
+):
+    """Approve or reject many leave requests of the calling HOD at once."""
+    return await _move_many(db, "leave", body, current_user)
+
+
 @app.post("/custom-letters/{letter_id}/approve")
 async def approve_custom_letter(
     letter_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
 ):
-    # Fetch letter
-    letter = (
-        db.query(CustomLetterRequest)
-        .filter(CustomLetterRequest.id == letter_id)
-        .first()
-    )
-
-    if not letter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Custom letter not found",
-        )
-
-    # Permission check: only receiver can approve
-    if current_user.id != letter.receiver_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to approve this letter",
-        )
-
-    # Status check
-    if letter.status != "submitted":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Custom letter already decided",
-        )
-
-    # Update
-    letter.status = "approved"
-    letter.decided_by = current_user.id
-    letter.updated_at = datetime.utcnow()
-
-    db.commit()
-
-    # Notify sender
-    await manager.notify(
-        letter.student_id,
-        {
-            "title": "Custom Letter Approved",
-            "message": "Your custom letter has been approved",
-            "type": "CUSTOM_LETTER_APPROVED",
-            "request_id": letter.id,
-        }
-    )
+    # only the addressee may decide; see CUSTOM_LETTER_WORKFLOW
+    await _move(db, "custom", "approve", current_user, letter_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
     return {
         "message": "Custom letter approved successfully",
@@ -2178,94 +2136,98 @@ async def approve_custom_letter(
 @app.post("/custom-letters/{letter_id}/reject")
 async def reject_custom_letter(
     letter_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
 ):
-    # Fetch letter
-    letter = (
-        db.query(CustomLetterRequest)
-        .filter(CustomLetterRequest.id == letter_id)
-        .first()
-    )
-
-    if not letter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Custom letter not found",
-        )
-
-    # Permission check
-    if current_user.id != letter.receiver_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to reject this letter",
-        )
-
-    # Status check
-    if letter.status != "submitted":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Custom letter already decided",
-        )
-
-    # Update
-    letter.status = "rejected"
-    letter.decided_by = current_user.id
-
-    db.commit()
-
-    # Notify sender
-    await manager.notify(
-        letter.student_id,
-        {
-            "title": "Custom Letter Rejected",
-            "message": "Your custom letter has been rejected",
-            "type": "CUSTOM_LETTER_REJECTED",
-            "request_id": letter.id,
-        }
-    )
+    await _move(db, "custom", "reject", current_user, letter_id)
+    await db.commit()
+    outbox_dispatcher.wake()
 
     return {
         "message": "Custom letter rejected successfully",
         "rejected_by": current_user.role,
     }
+
+
+@app.post("/custom-letters/decisions", response_model=schemas.BatchDecisionOut)
+async def decide_custom_letters(
+    body: schemas.BatchDecisionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async),
+):
+    """Approve or reject many custom letters addressed to the caller at once."""
+    return await _move_many(db, "custom", body, current_user)
     
 
 @app.post("/users/upload-signature")
-def upload_signature(
+async def upload_signature(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
+    previous = current_user.signature_path
+    current_user.signature_path = await save_signature(file)
+    await db.commit()
+    user_cache.invalidate(current_user.id)
 
-    if file.content_type not in ["image/png", "image/jpeg"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only PNG or JPG images are allowed",
-        )
+    if previous and previous != current_user.signature_path:
+        await release_signature(db, previous)
 
-    upload_dir = "uploads/signatures"
-    os.makedirs(upload_dir, exist_ok=True)
+    return {"message": "Signature uploaded successfully"}
 
-    file_ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(upload_dir, filename)
+@app.get("/signatures/{variant}/{filename}")
+async def get_signature_variant(variant: str, filename: str):
+    """
+    Downsized WebP of a stored signature, for letter / certificate
+    previews. Stored signature files are never rewritten, so the response
+    can be cached for good.
+    """
+    if variant not in VARIANTS or not SIGNATURE_NAME.fullmatch(filename):
+        raise HTTPException(status_code=404, detail="Signature not found")
 
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
+    try:
+        body = await signature_variant(f"{PATH_PREFIX}signatures/{filename}", variant)
+    except (OSError, UnidentifiedImageError):
+        # missing, or not an image PIL can read
+        raise HTTPException(status_code=404, detail="Signature not found")
 
-    current_user.signature_path = file_path
-    db.commit()
-    db.refresh(current_user)
+    return Response(
+        body,
+        media_type="image/webp",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@app.post("/storage/gc")
+def collect_storage_garbage(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Delete stored signatures (and their variants) no user references."""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Only admin can clean up storage",
+        )
+
+    referenced = set(
+        db.scalars(
+            select(models.User.signature_path)
+            .where(models.User.signature_path.is_not(None))
+            .distinct()
+        )
+    )
+    return collect_signature_garbage(referenced)
 
-    return {"message": "Signature uploaded successfully"}
 
 @app.websocket("/ws/notifications")
 async def websocket_notifications(
     websocket: WebSocket,
-    db: Session = Depends(get_db),
 ):
-    current_user = get_current_user_ws(websocket, db)
+    # Short-lived session: the socket must not pin a pooled connection
+    # for as long as it stays open.
+    async with AsyncSessionLocal() as db:
+        current_user = await get_current_user_ws(websocket, db)
 
     await manager.connect(current_user.id, websocket)
 
@@ -2273,11 +2235,13 @@ async def websocket_notifications(
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(current_user.id)
+        pass
+    finally:
+        manager.disconnect(current_user.id, websocket)
 
 
 @app.get("/test-ws")
-async def test_ws(current_user=Depends(get_current_user)):
+async def test_ws(current_user: UserSnapshot = Depends(get_current_principal)):
     await manager.notify(
         current_user.id,
         {
@@ -2287,9 +2251,46 @@ async def test_ws(current_user=Depends(get_current_user)):
     )
     return {"ok": True}
 
+def require_admin(
+    current_user: UserSnapshot = Depends(get_current_principal),
+) -> UserSnapshot:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Only admin can view metrics",
+        )
+    return current_user
+
+
+@app.get("/metrics/db-pool", dependencies=[Depends(require_admin)])
+def get_db_pool_metrics():
+    """Connection pool occupancy and checkout wait times for this worker."""
+    return pool_metrics()
+
+
+@app.get("/metrics/render-cache", dependencies=[Depends(require_admin)])
+def get_render_cache_metrics():
+    """Size and hit counts of this worker's rendered-letter cache."""
+    return render_cache.stats()
+
+
+@app.get("/metrics/auth", dependencies=[Depends(require_admin)])
+def get_auth_metrics():
+    """Password hashing queue and login throttling of this worker."""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "login_throttle": login_throttle.stats(),
+    }
+
+
+@app.get("/metrics/pdf", dependencies=[Depends(require_admin)])
+def get_pdf_metrics():
+    """PDF renders done by this worker and served from the disk cache."""
+    return pdf_renderer.stats()
+
 @app.get("/letter-template")
 def get_letter_template(
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     if current_user.role != "student":
@@ -2304,38 +2305,15 @@ def get_letter_template(
             detail="Student college or department not assigned",
         )
 
-    # --- Fetch HOD ---
-    hod = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "hod",
-            models.User.department_name == current_user.department_name,
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    # --- Resolve recipients from the routing directory ---
+    hod = routing_directory.hod(
+        db, current_user.college_name, current_user.department_name
     )
-
-    # --- Fetch Vice Principal ---
-    vice_principal = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "vice_principal",
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    vice_principal = routing_directory.college_approver(
+        db, current_user.college_name, "vice_principal"
     )
-
-    # --- Fetch Principal ---
-    principal = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "principal",
-            models.User.college_name == current_user.college_name,
-            models.User.access_status == "approved",
-        )
-        .first()
+    principal = routing_directory.college_approver(
+        db, current_user.college_name, "principal"
     )
 
     if not hod:
@@ -2374,48 +2352,17 @@ def get_letter_template(
 )
 async def arrange_certificate_delivery(
     data: schemas.CertificateDeliveryCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # 🔐 ROLE CHECK
-    if current_user.role != "superintendent":
-        raise HTTPException(
-            status_code=403,
-            detail="Only superintendent can arrange certificate delivery",
-        )
-
-    # 🔍 FETCH CERTIFICATE REQUEST
-    cert_request = (
-        db.query(models.CertificateRequest)
-        .filter(models.CertificateRequest.id == data.certificate_request_id)
-        .first()
-    )
-
-    if not cert_request:
-        raise HTTPException(
-            status_code=404,
-            detail="Certificate request not found",
-        )
-
-    # 🚫 PREVENT DUPLICATE DELIVERY
-    existing_delivery = (
-        db.query(models.CertificateDelivery)
-        .filter(
-            models.CertificateDelivery.certificate_request_id
-            == data.certificate_request_id
-        )
-        .first()
+    # 🔄 approved → delivery_initiated; also refuses a second delivery
+    cert_request = await _move(
+        db, "certificate", "deliver", current_user, data.certificate_request_id
     )
 
-    if existing_delivery:
-        raise HTTPException(
-            status_code=400,
-            detail="Delivery already arranged for this certificate request",
-        )
-
     # ✅ CREATE DELIVERY ENTRY
     delivery = models.CertificateDelivery(
-        certificate_request_id=cert_request.id,
+        certificate_request_id=cert_request["id"],
         pickup_date=data.pickup_date,
         pickup_time=data.pickup_time,
         pickup_location=data.pickup_location,
@@ -2423,15 +2370,10 @@ async def arrange_certificate_delivery(
 
     db.add(delivery)
 
-    # 🔄 UPDATE CERTIFICATE STATUS
-    cert_request.overall_status = "delivery_initiated"
-
-    db.commit()
-    db.refresh(delivery)
-
     # 🔔 NOTIFY STUDENT
-    await manager.notify(
-        cert_request.student_id,
+    queue_notification(
+        db,
+        cert_request["student_id"],
         {
             "title": "Certificate Ready for Pickup",
             "message": (
@@ -2440,15 +2382,15 @@ async def arrange_certificate_delivery(
                 f"from {data.pickup_location.replace('_', ' ').title()}."
             ),
             "type": "CERTIFICATE_READY",
-            "request_id": cert_request.id,
+            "request_id": cert_request["id"],
         }
     )
 
     # 💬 OPTIONAL SYSTEM MESSAGE (like your create API)
-    send_system_message(
-        db=db,
+    queue_system_message(
+        db,
         sender_id=current_user.id,
-        receiver_id=cert_request.student_id,
+        receiver_id=cert_request["student_id"],
         text=(
             "Your certificate is ready for pickup.\n"
             f"Date: {data.pickup_date}\n"
@@ -2457,6 +2399,10 @@ async def arrange_certificate_delivery(
         ),
     )
 
+    await db.commit()
+    await db.refresh(delivery)
+    outbox_dispatcher.wake()
+
     return {
         "message": "Certificate delivery arranged and student notified",
         "delivery_id": delivery.id,
@@ -2469,7 +2415,9 @@ async def arrange_certificate_delivery(
 )
 def get_certificate_delivery(
     certificate_request_id: int,
-    current_user: models.User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
 
@@ -2493,6 +2441,16 @@ def get_certificate_delivery(
     cert_request = delivery.certificate_request
     student = cert_request.student
 
+    not_modified = http_cache.conditional(
+        request,
+        response,
+        etag=weak_etag(delivery.id, delivery.collected_at, cert_request.updated_at),
+        last_modified=cert_request.updated_at,
+        policy=http_cache.PRIVATE,
+    )
+    if not_modified:
+        return not_modified
+
     return schemas.CertificateDeliveryOut(
         certificate_request_id=cert_request.id,
         student_name=student.name,
@@ -2508,89 +2466,184 @@ def get_certificate_delivery(
 )
 async def mark_certificate_collected(
     certificate_request_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # 🔐 ROLE CHECK
-    if current_user.role != "superintendent":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only superintendent can mark certificate as collected",
-        )
+    # 🔄 delivery_initiated → collected
+    cert_request = await _move(
+        db, "certificate", "collect", current_user, certificate_request_id
+    )
 
-    # 🔍 FETCH DELIVERY
-    delivery = (
-        db.query(models.CertificateDelivery)
-        .filter(
+    await db.execute(
+        update(models.CertificateDelivery)
+        .where(
             models.CertificateDelivery.certificate_request_id
             == certificate_request_id
         )
-        .first()
-    )
-
-    if not delivery:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Certificate delivery not found",
-        )
-
-    # 🔍 FETCH CERTIFICATE REQUEST
-    cert_request = (
-        db.query(models.CertificateRequest)
-        .filter(models.CertificateRequest.id == certificate_request_id)
-        .first()
+        .values(collected_at=func.now())
     )
 
-    if not cert_request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Certificate request not found",
-        )
-
-    # 🚫 ALREADY COLLECTED
-    if cert_request.overall_status == "collected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Certificate already marked as collected",
-        )
-
-    # ✅ UPDATE STATUS
-    cert_request.overall_status = "collected"
-    delivery.collected_at = datetime.utcnow()
-
-    db.commit()
-
     # 🔔 NOTIFY STUDENT
-    await manager.notify(
-        cert_request.student_id,
+    queue_notification(
+        db,
+        cert_request["student_id"],
         {
             "title": "Certificate Collected",
             "message": "Your certificate has been successfully collected.",
             "type": "CERTIFICATE_COLLECTED",
-            "request_id": cert_request.id,
+            "request_id": cert_request["id"],
         }
     )
 
     # 💬 SYSTEM MESSAGE (optional but consistent)
-    send_system_message(
-        db=db,
+    queue_system_message(
+        db,
         sender_id=current_user.id,
-        receiver_id=cert_request.student_id,
+        receiver_id=cert_request["student_id"],
         text="Your certificate has been marked as collected. Thank you.",
     )
 
+    await db.commit()
+    outbox_dispatcher.wake()
+
     return {
         "message": "Certificate marked as collected successfully",
-        "certificate_request_id": cert_request.id,
+        "certificate_request_id": cert_request["id"],
     }
 
 
+# (model, status column, columns of the users shown) per document type;
+# the users are in the order _verify_payload versions them
+_VERIFY_MODELS = {
+    LetterType.leave: (
+        models.LeaveRequest,
+        models.LeaveRequest.overall_status,
+        ("student_id", "hod_id"),
+    ),
+    LetterType.custom: (
+        models.CustomLetterRequest,
+        models.CustomLetterRequest.status,
+        ("student_id", "receiver_id"),
+    ),
+    LetterType.certificate: (
+        models.CertificateRequest,
+        models.CertificateRequest.overall_status,
+        ("student_id", "hod_id", "vp_id", "principal_id"),
+    ),
+}
+
+
+def _verify_sources(db: Session, letter_type: LetterType, record_id: int):
+    """(cache key, current_version, render) of a document's /verify payload."""
+    model, status_column, people = _VERIFY_MODELS[letter_type]
+
+    def current_version():
+        stmt = select(model.updated_at, status_column).where(model.id == record_id)
+        for column in people:
+            user = aliased(models.User)
+            stmt = stmt.outerjoin(user, user.id == getattr(model, column)).add_columns(
+                *user_version_columns(user)
+            )
+        row = db.execute(stmt).first()
+        return record_version(*row) if row else None
+
+    return (
+        ("verify", letter_type.value, record_id),
+        current_version,
+        lambda: _verify_payload(db, letter_type, record_id),
+    )
+
+
 @app.get("/verify/{letter_type}/{record_id}")
 def verify_document(
     letter_type: LetterType,
     record_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    Public verification payload of a letter. Shared links are opened over
+    and over, so the payload is cached per record version and carries an
+    ETag.
+    """
+    return serve_cached(request, *_verify_sources(db, letter_type, record_id))
+
+
+def _pdf_source(db: Session, letter_type: LetterType, record_id: int):
+    """(payload, version, etag) a document's PDF is rendered from."""
+    doc = cached_document(*_verify_sources(db, letter_type, record_id))
+    return json.loads(doc.body), doc.etag, f'"{pdf_renderer.version_tag(doc.etag)}"'
+
+
+def _submit_pdf(payload: dict, version: str):
+    try:
+        return pdf_renderer.submit(payload, version)
+    except NotPrintable as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+@app.get("/verify/{letter_type}/{record_id}/pdf")
+def verify_document_pdf(
+    letter_type: LetterType,
+    record_id: int,
+    request: Request,
     db: Session = Depends(get_db),
 ):
+    """
+    Printable PDF of an approved letter or certificate, with the
+    approvers' signatures. Same data and access as the /verify payload;
+    409 while the document is not approved.
+    """
+    payload, version, etag = _pdf_source(db, letter_type, record_id)
+    headers = {"ETag": etag, "Cache-Control": http_cache.PUBLIC}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        _submit_pdf(payload, version).result(),
+        media_type="application/pdf",
+        filename=f"{letter_type.value}-{record_id}.pdf",
+        content_disposition_type="inline",
+        headers=headers,
+    )
+
+
+@app.post("/documents/pdf")
+def print_documents(
+    payload: schemas.DocumentBatchRequest,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    One PDF with every requested document, in the order given, for bulk
+    printing. Documents render in parallel on the PDF workers.
+    """
+    if current_user.role not in ("superintendent", "admin"):
+        raise HTTPException(
+            status_code=403,
+            detail="Only superintendent can print documents in bulk",
+        )
+
+    futures = [
+        _submit_pdf(*_pdf_source(db, LetterType(ref.type), ref.id)[:2])
+        for ref in payload.documents
+    ]
+
+    writer = PdfWriter()
+    for future in futures:
+        writer.append(future.result())
+    body = io.BytesIO()
+    writer.write(body)
+
+    return Response(
+        body.getvalue(),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="documents.pdf"'},
+    )
+
+
+def _verify_payload(db: Session, letter_type: LetterType, record_id: int):
+    """(version, payload) of a document, read from the database."""
 
     # -------------------- LEAVE --------------------
     if letter_type == LetterType.leave:
@@ -2608,11 +2661,18 @@ def verify_document(
         if not leave:
             raise HTTPException(404, "Leave request not found")
 
-        return {
+        version = record_version(
+            leave.updated_at,
+            leave.overall_status,
+            *user_version(leave.student),
+            *user_version(leave.hod),
+        )
+        return version, {
             "type": "leave",
             "id": leave.id,
             "status": leave.overall_status,
             "created_at": leave.created_at,
+            "subject": leave.subject,
 
             "student": {
                 "name": leave.student.name,
@@ -2654,7 +2714,13 @@ def verify_document(
         if not letter:
             raise HTTPException(404, "Custom letter not found")
 
-        return {
+        version = record_version(
+            letter.updated_at,
+            letter.status,
+            *user_version(letter.student),
+            *user_version(letter.receiver),
+        )
+        return version, {
             "type": "custom",
             "id": letter.id,
             "status": letter.status,
@@ -2705,7 +2771,15 @@ def verify_document(
         if not request:
             raise HTTPException(404, "Certificate request not found")
 
-        return {
+        version = record_version(
+            request.updated_at,
+            request.overall_status,
+            *user_version(request.student),
+            *user_version(request.hod),
+            *user_version(request.vp),
+            *user_version(request.principal),
+        )
+        return version, {
             "type": "certificate",
             "id": request.id,
             "status": request.overall_status,
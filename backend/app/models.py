@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Date, DateTime,Time, ForeignKey, Integer, String, Text, func
+from sqlalchemy import JSON, Column, Date, DateTime,Time, Float, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # approver routing: role + college (+ department for HODs)
+        Index(
+            "ix_users_role_college_department_status",
+            "role",
+            "college_name",
+            "department_name",
+            "access_status",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -72,6 +82,11 @@ class College(Base):
 
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        # inbox pages are keyset-ordered by (created_at, id)
+        Index("ix_leave_requests_hod_created", "hod_id", "created_at", "id"),
+        Index("ix_leave_requests_student_created", "student_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -155,6 +170,12 @@ class LeaveApproval(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_pair_created", "sender_id", "receiver_id", "created_at"),
+    )
+    # fetch created_at in the INSERT (RETURNING) so new messages can be
+    # pushed over the websocket without a refresh query
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -163,6 +184,10 @@ class Message(Base):
 
     content = Column(Text, nullable=False)
 
+    # In-app path the message points at (e.g. "/leaves/12"), shown as a
+    # link card under the text
+    link = Column(String(255), nullable=True)
+
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -174,8 +199,98 @@ class Message(Base):
 
 
 
+class OutboxEvent(Base):
+    """
+    Notification or system message waiting to be delivered.
+
+    Written in the same transaction as the domain change that caused it,
+    then turned into Message rows / websocket pushes and deleted by the
+    outbox dispatcher (app/services/outbox.py).
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # "notification" (websocket push) / "system_message" (Message row + push)
+    kind = Column(String(20), nullable=False)
+
+    recipient_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+
+    payload = Column(JSON, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+
+
+class LoginThrottleBucket(Base):
+    """
+    Token bucket of failed sign-ins for one email or client address,
+    shared by all workers when LOGIN_THROTTLE_BACKEND=postgres
+    (app/services/login_throttle.py).
+    """
+
+    __tablename__ = "login_throttle_buckets"
+
+    # "email:<address>" / "ip:<address>"
+    key = Column(String(330), primary_key=True)
+
+    tokens = Column(Float, nullable=False)
+
+    # unix time `tokens` was last brought up to date
+    refilled_at = Column(Float, nullable=False)
+
+
+class RefreshSession(Base):
+    """
+    One signed-in device. Its refresh token carries (id, generation);
+    every refresh bumps the generation, so an older token presented again
+    means it was copied and the row is deleted. Deleting the row is how a
+    session is revoked (app/services/refresh_tokens.py).
+    """
+
+    __tablename__ = "refresh_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    generation = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+
 class CertificateRequest(Base):
     __tablename__ = "certificate_requests"
+    __table_args__ = (
+        Index("ix_certificate_requests_hod_status", "hod_id", "overall_status"),
+        Index("ix_certificate_requests_vp_status", "vp_id", "overall_status"),
+        Index(
+            "ix_certificate_requests_principal_status",
+            "principal_id",
+            "overall_status",
+        ),
+        Index(
+            "ix_certificate_requests_student_created",
+            "student_id",
+            "created_at",
+            "id",
+        ),
+        # superintendent inbox filters on status alone
+        Index(
+            "ix_certificate_requests_status_created",
+            "overall_status",
+            "created_at",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -224,6 +339,14 @@ class CertificateRequest(Base):
     vp_updated_at = Column(DateTime(timezone=True), nullable=True)
     principal_updated_at = Column(DateTime(timezone=True), nullable=True)
 
+    # bumped on every change; version of rendered documents and ETags
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
 
     # relationships
     student = relationship(
@@ -255,6 +378,13 @@ class CertificateRequest(Base):
 
 class CertificateApproval(Base):
     __tablename__ = "certificate_approvals"
+    __table_args__ = (
+        Index(
+            "ix_certificate_approvals_request_approver",
+            "request_id",
+            "approver_id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -287,6 +417,14 @@ class CertificateApproval(Base):
 
 class CustomLetterRequest(Base):
     __tablename__ = "custom_letter_requests"
+    __table_args__ = (
+        Index(
+            "ix_custom_letter_requests_receiver_created",
+            "receiver_id",
+            "created_at",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -1,7 +1,7 @@
 from datetime import date, datetime, time
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -45,9 +45,19 @@ class UserBasic(BaseModel):
 class AuthResponse(BaseModel):
     message: str
     jwt_token: str
+    refresh_token: Optional[str] = None
     user: UserProfile
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenPair(BaseModel):
+    jwt_token: str
+    refresh_token: str
+
+
 class StudentOut(BaseModel):
     name: str
     department_name: str | None = None
@@ -120,6 +130,45 @@ class LeaveCreate(BaseModel):
     to_date: date
 
 
+class LeaveLetterBatchRequest(BaseModel):
+    leave_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class DocumentRef(BaseModel):
+    type: Literal["leave", "custom", "certificate"]
+    id: int
+
+
+class DocumentBatchRequest(BaseModel):
+    documents: List[DocumentRef] = Field(..., min_length=1, max_length=50)
+
+
+class BatchDecisionRequest(BaseModel):
+    action: Literal["approve", "reject", "forward"]
+    ids: List[int] = Field(..., min_length=1, max_length=200)
+    # stored on each of the caller's approvals
+    remarks: Optional[str] = None
+
+
+class BatchItemOut(BaseModel):
+    id: int
+    ok: bool
+    status_code: int
+    status: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BatchDecisionOut(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemOut]
+
+
+class LeaveLetterOut(BaseModel):
+    leave_id: int
+    letter: str
+
+
 class LeaveUpdateStatus(BaseModel):
     status: str  # approved or rejected
     approver_id: int  # the user who approves/rejects
@@ -0,0 +1,99 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.outbox import queue_notification
+
+
+@dataclass(frozen=True)
+class Notice:
+    """
+    Notification of one bulk action. A recipient with a single affected
+    request gets the usual message; one with several gets a single
+    summary listing them all.
+    """
+
+    type: str
+    title: str
+    message: str
+    batch_title: str
+    batch_message: str
+
+    def payload(self, request_ids: list, **fields) -> dict:
+        count = len(request_ids)
+        if count == 1:
+            return {
+                "title": self.title.format(**fields),
+                "message": self.message.format(**fields),
+                "type": self.type,
+                "request_id": request_ids[0],
+            }
+        return {
+            "title": self.batch_title.format(count=count, **fields),
+            "message": self.batch_message.format(count=count, **fields),
+            "type": self.type,
+            "request_id": request_ids[0],
+            "request_ids": request_ids,
+        }
+
+
+@dataclass
+class ItemResult:
+    id: int
+    ok: bool
+    status_code: int
+    status: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class DecisionBatch:
+    """
+    Outcome of one bulk approve / reject / forward: a result per
+    requested id, in request order, and the notifications it causes,
+    coalesced per recipient.
+    """
+
+    def __init__(self, ids: list):
+        # a repeated id is handled once
+        self.ids = list(dict.fromkeys(ids))
+        self._results: dict[int, ItemResult] = {}
+        self._notify: dict[tuple, list] = defaultdict(list)
+
+    def fail(self, item_id: int, status_code: int, detail: str):
+        self._results[item_id] = ItemResult(item_id, False, status_code, detail=detail)
+
+    def done(self, item_id: int, status: str, notice: Optional[Notice] = None, recipient_id: Optional[int] = None):
+        self._results[item_id] = ItemResult(item_id, True, 200, status=status)
+        if notice is not None and recipient_id is not None:
+            self._notify[(recipient_id, notice)].append(item_id)
+
+    @property
+    def succeeded(self) -> list:
+        return [result.id for result in self._results.values() if result.ok]
+
+    def queue_notifications(self, db, **fields):
+        """One outbox event per (recipient, kind) in the caller's transaction."""
+        for (recipient_id, notice), request_ids in self._notify.items():
+            queue_notification(db, recipient_id, notice.payload(request_ids, **fields))
+
+    def result(self) -> dict:
+        results = [self._results[item_id] for item_id in self.ids]
+        succeeded = sum(result.ok for result in results)
+        return {
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": [result.__dict__ for result in results],
+        }
+
+
+async def load_for_update(db: AsyncSession, stmt, of) -> dict:
+    """
+    {id: row} for a statement selecting (entity, ...) filtered to the
+    requested ids: the whole set in one query, with the `of` rows locked
+    until commit so two approvers acting on the same requests cannot
+    both win.
+    """
+    rows = (await db.execute(stmt.with_for_update(of=of))).all()
+    return {row[0].id: row for row in rows}
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.config import COLLEGE_DIRECTORY_TTL_SECONDS
+from app.services.http_cache import weak_etag
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    colleges: list
+    etag: str
+    loaded_at: float
+
+
+class CollegeDirectory:
+    """
+    In-process copy of the public college listing (GET /colleges/).
+
+    Every registration form loads this list on mount, so it is built
+    with one joined query and then served from memory with a fixed ETag.
+    `invalidate()` must follow any change to colleges or to who their
+    principal / vice principal is; the TTL only bounds how long another
+    worker can serve the old list.
+    """
+
+    def __init__(self, ttl_seconds: float = COLLEGE_DIRECTORY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        # bumped by invalidate(); a load that started before the bump
+        # may have read old rows and is not kept
+        self._generation = 0
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+
+    def _install(self, snapshot: _Snapshot, generation: int) -> _Snapshot:
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _load(self, db: Session) -> _Snapshot:
+        User = models.User
+        College = models.College
+        principal = aliased(User)
+        vice_principal = aliased(User)
+
+        # First approved vice principal of each college
+        vp_ids = (
+            select(User.college_name, func.min(User.id).label("vp_id"))
+            .where(
+                User.role == "vice_principal",
+                User.access_status == "approved",
+            )
+            .group_by(User.college_name)
+            .subquery()
+        )
+
+        rows = db.execute(
+            select(
+                College.id,
+                College.name,
+                College.address,
+                College.city,
+                College.zip_code,
+                College.departments,
+                principal.name.label("principal_name"),
+                principal.email.label("principal_email"),
+                vice_principal.name.label("vice_principal_name"),
+                vice_principal.email.label("vice_principal_email"),
+            )
+            # CollegeOut needs a principal; colleges without one (the seeded
+            # default college) used to fail the whole listing
+            .join(principal, principal.id == College.principal_id)
+            .outerjoin(vp_ids, vp_ids.c.college_name == College.name)
+            .outerjoin(vice_principal, vice_principal.id == vp_ids.c.vp_id)
+            .order_by(College.id)
+        ).all()
+
+        colleges = [dict(row._mapping) for row in rows]
+        return _Snapshot(
+            colleges=colleges,
+            etag=weak_etag(json.dumps(colleges, sort_keys=True, default=str)),
+            loaded_at=time.monotonic(),
+        )
+
+    def get(self, db: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot and time.monotonic() - snapshot.loaded_at < self.ttl_seconds:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot and time.monotonic() - snapshot.loaded_at < self.ttl_seconds:
+                return snapshot
+            generation = self._generation
+            return self._install(self._load(db), generation)
+
+
+college_directory = CollegeDirectory()
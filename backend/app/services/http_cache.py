@@ -0,0 +1,90 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.config import HTTP_CACHE_PUBLIC_MAX_AGE_SECONDS
+
+
+# Cache-Control policies for GET routes
+# - PUBLIC: same for everyone, browsers and proxies may reuse it briefly
+# - PRIVATE: per user; the browser keeps it but revalidates every time,
+#   which costs a 304 instead of the full payload when nothing changed
+PUBLIC = (
+    f"public, max-age={HTTP_CACHE_PUBLIC_MAX_AGE_SECONDS}, "
+    f"stale-while-revalidate={HTTP_CACHE_PUBLIC_MAX_AGE_SECONDS * 5}"
+)
+PRIVATE = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    """W/"..." validator from the version columns a response is built from."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return 'W/"%s"' % hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check, using weak comparison."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in header.split(",")
+    )
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have second precision
+    return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    *,
+    etag: str,
+    policy: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Put validators and Cache-Control on `response`.
+
+    Returns a 304 response to send instead when the client's copy is
+    current, else None and the handler builds its normal body.
+    If-None-Match wins over If-Modified-Since, as in RFC 9110.
+    """
+    headers = {"ETag": etag, "Cache-Control": policy}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    if policy == PRIVATE:
+        headers["Vary"] = "Authorization"
+
+    response.headers.update(headers)
+
+    if request.headers.get("if-none-match") is not None:
+        fresh = etag_matches(request, etag)
+    else:
+        fresh = last_modified is not None and _not_modified_since(request, last_modified)
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return None
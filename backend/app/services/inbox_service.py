@@ -0,0 +1,278 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, and_, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.user_cache import UserSnapshot
+
+
+# Request kinds, in the order used as the keyset tie-breaker.
+LEAVE = "leave"
+CERTIFICATE = "certificate"
+CUSTOM = "custom"
+
+TYPE_LABELS = {
+    LEAVE: "Leave",
+    CERTIFICATE: "Certificate",
+    CUSTOM: "Custom Letter",
+}
+
+VIEW_URLS = {
+    LEAVE: "/leaves/{id}",
+    CERTIFICATE: "/certificate-requests/{id}",
+    CUSTOM: "/custom-letters/{id}",
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, kind: str, record_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), kind, record_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, kind, record_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(kind), int(record_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def _after_cursor(kind: str, created_col, id_col, cursor):
+    """
+    Keyset predicate for one branch of the union.
+
+    Rows are ordered by (created_at, kind, id) descending. Inside a branch
+    the kind is a constant, so the row-value comparison collapses to a
+    plain (created_at, id) range that the per-table indexes can serve.
+    """
+    c_at, c_kind, c_id = cursor
+
+    if kind < c_kind:
+        return created_col <= c_at
+    if kind > c_kind:
+        return created_col < c_at
+    return or_(
+        created_col < c_at,
+        and_(created_col == c_at, id_col < c_id),
+    )
+
+
+def _leave_branch(conditions, status, cursor):
+    LeaveRequest = models.LeaveRequest
+
+    if status:
+        conditions.append(LeaveRequest.overall_status == status)
+    if cursor:
+        conditions.append(
+            _after_cursor(LEAVE, LeaveRequest.created_at, LeaveRequest.id, cursor)
+        )
+
+    return (
+        select(
+            LeaveRequest.id.label("id"),
+            models.User.name.label("sender"),
+            literal(LEAVE, String).label("kind"),
+            LeaveRequest.subject.label("subject"),
+            LeaveRequest.created_at.label("created_at"),
+            LeaveRequest.overall_status.label("overall_status"),
+        )
+        .join(models.User, models.User.id == LeaveRequest.student_id)
+        .where(*conditions)
+    )
+
+
+def _certificate_branch(conditions, status, cursor):
+    CertificateRequest = models.CertificateRequest
+
+    if status:
+        conditions.append(CertificateRequest.overall_status == status)
+    if cursor:
+        conditions.append(
+            _after_cursor(
+                CERTIFICATE,
+                CertificateRequest.created_at,
+                CertificateRequest.id,
+                cursor,
+            )
+        )
+
+    return (
+        select(
+            CertificateRequest.id.label("id"),
+            models.User.name.label("sender"),
+            literal(CERTIFICATE, String).label("kind"),
+            literal("Certificate Request", String).label("subject"),
+            CertificateRequest.created_at.label("created_at"),
+            CertificateRequest.overall_status.label("overall_status"),
+        )
+        .join(models.User, models.User.id == CertificateRequest.student_id)
+        .where(*conditions)
+    )
+
+
+def _custom_branch(conditions, status, cursor):
+    CustomLetterRequest = models.CustomLetterRequest
+
+    if status:
+        conditions.append(CustomLetterRequest.status == status)
+    if cursor:
+        conditions.append(
+            _after_cursor(
+                CUSTOM,
+                CustomLetterRequest.created_at,
+                CustomLetterRequest.id,
+                cursor,
+            )
+        )
+
+    return (
+        select(
+            CustomLetterRequest.id.label("id"),
+            models.User.name.label("sender"),
+            literal(CUSTOM, String).label("kind"),
+            (literal("Letter to ", String) + CustomLetterRequest.to_role).label(
+                "subject"
+            ),
+            CustomLetterRequest.created_at.label("created_at"),
+            CustomLetterRequest.status.label("overall_status"),
+        )
+        .join(models.User, models.User.id == CustomLetterRequest.student_id)
+        .where(*conditions)
+    )
+
+
+def _role_sources(user: UserSnapshot) -> dict:
+    """
+    Base filters per request kind for the inbox of `user`.
+    A kind missing from the result is not visible to that role.
+    """
+    LeaveRequest = models.LeaveRequest
+    CertificateRequest = models.CertificateRequest
+    CustomLetterRequest = models.CustomLetterRequest
+
+    if user.role == "student":
+        return {
+            LEAVE: [LeaveRequest.student_id == user.id],
+            CERTIFICATE: [CertificateRequest.student_id == user.id],
+            CUSTOM: [CustomLetterRequest.student_id == user.id],
+        }
+
+    if user.role == "hod":
+        return {
+            LEAVE: [LeaveRequest.hod_id == user.id],
+            CERTIFICATE: [CertificateRequest.hod_id == user.id],
+            CUSTOM: [CustomLetterRequest.receiver_id == user.id],
+        }
+
+    if user.role == "principal":
+        return {
+            CERTIFICATE: [
+                CertificateRequest.principal_id == user.id,
+                CertificateRequest.overall_status.in_(
+                    ["forwarded_to_principal", "approved"]
+                ),
+            ],
+            CUSTOM: [CustomLetterRequest.receiver_id == user.id],
+        }
+
+    if user.role == "superintendent":
+        return {
+            CERTIFICATE: [
+                CertificateRequest.overall_status.in_(
+                    ["approved", "collected", "delivery_initiated"]
+                ),
+            ],
+            CUSTOM: [CustomLetterRequest.receiver_id == user.id],
+        }
+
+    if user.role == "vice_principal":
+        return {
+            CERTIFICATE: [
+                CertificateRequest.vp_id == user.id,
+                CertificateRequest.overall_status.in_(
+                    ["forwarded_to_vp", "forwarded_to_principal"]
+                ),
+            ],
+            CUSTOM: [CustomLetterRequest.receiver_id == user.id],
+        }
+
+    return {}
+
+
+_BRANCHES = {
+    LEAVE: _leave_branch,
+    CERTIFICATE: _certificate_branch,
+    CUSTOM: _custom_branch,
+}
+
+
+def fetch_inbox_page(
+    *,
+    db: Session,
+    user: UserSnapshot,
+    limit: int,
+    cursor: Optional[str] = None,
+    kind: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """
+    One page of the unified request inbox, newest first.
+
+    All request kinds visible to the user are merged with a single
+    UNION ALL query, so a page costs one round trip regardless of how
+    much history the user has. Returns (items, next_cursor).
+    """
+    after = decode_cursor(cursor) if cursor else None
+
+    sources = _role_sources(user)
+    if kind:
+        sources = {k: v for k, v in sources.items() if k == kind}
+
+    if not sources:
+        return [], None
+
+    branches = [
+        _BRANCHES[k](list(conditions), status, after)
+        for k, conditions in sources.items()
+    ]
+    inbox = union_all(*branches).subquery("inbox")
+
+    rows = db.execute(
+        select(inbox)
+        .order_by(
+            inbox.c.created_at.desc(),
+            inbox.c.kind.desc(),
+            inbox.c.id.desc(),
+        )
+        .limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.kind, last.id)
+
+    items = [
+        {
+            "id": row.id,
+            "sender": row.sender,
+            "type": TYPE_LABELS[row.kind],
+            "subject": row.subject,
+            "created_at": row.created_at,
+            "overall_status": row.overall_status,
+            "view_url": VIEW_URLS[row.kind].format(id=row.id),
+        }
+        for row in rows
+    ]
+
+    return items, next_cursor
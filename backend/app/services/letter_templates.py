@@ -0,0 +1,151 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config import TEMPLATE_RELOAD_CHECK_SECONDS
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent.parent / "templates"
+
+# {{name}} placeholders, as used by the .txt templates
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    A template split once into literal text and placeholder names.
+
+    `segments` alternates literal, name, literal, name, ..., literal, so
+    rendering is a single join with no rescanning of the text.
+    """
+
+    segments: tuple
+    mtime_ns: int
+
+    @classmethod
+    def parse(cls, text: str, mtime_ns: int = 0) -> "CompiledTemplate":
+        return cls(segments=tuple(_PLACEHOLDER.split(text)), mtime_ns=mtime_ns)
+
+    def render(self, values: dict) -> str:
+        parts = list(self.segments)
+        for i in range(1, len(parts), 2):
+            # Unknown placeholders are kept as they are in the file
+            value = values.get(parts[i])
+            parts[i] = "{{%s}}" % parts[i] if value is None else str(value)
+        return "".join(parts)
+
+
+class TemplateRegistry:
+    """
+    Compiled copies of every templates/*.txt file, keyed by file stem.
+
+    The directory is read on first use. After that, renders touch no
+    files; at most once every `check_interval` seconds the files' mtimes
+    are compared and changed, new or removed templates are picked up.
+    """
+
+    def __init__(
+        self,
+        directory: Path = TEMPLATES_DIR,
+        check_interval: float = TEMPLATE_RELOAD_CHECK_SECONDS,
+    ):
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._templates: dict[str, CompiledTemplate] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        found = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            entries = []
+
+        for entry in entries:
+            if not entry.name.endswith(".txt") or not entry.is_file():
+                continue
+            name = entry.name[: -len(".txt")]
+            mtime_ns = entry.stat().st_mtime_ns
+
+            current = self._templates.get(name)
+            if current and current.mtime_ns == mtime_ns:
+                found[name] = current
+                continue
+
+            text = Path(entry.path).read_text(encoding="utf-8")
+            found[name] = CompiledTemplate.parse(text, mtime_ns)
+
+        self._templates = found
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._refresh()
+                self._checked_at = now
+
+    def get(self, name: str) -> Optional[CompiledTemplate]:
+        self._ensure_fresh()
+        return self._templates.get(name)
+
+    def version(self, name: str) -> Optional[int]:
+        """mtime of the compiled template, to tell renders of different file versions apart."""
+        template = self.get(name)
+        return template.mtime_ns if template else None
+
+    def names(self) -> list[str]:
+        self._ensure_fresh()
+        return sorted(self._templates)
+
+    def reload(self):
+        """Force a rescan on the next render."""
+        self._checked_at = None
+
+
+template_registry = TemplateRegistry()
+
+
+def leave_template_version(leave_type: str) -> Optional[int]:
+    return template_registry.version(f"leave_{leave_type.lower()}")
+
+
+def render_leave_body(
+    leave_type: str,
+    student_name: str,
+    reason: Optional[str],
+    from_date: str,
+    to_date: str,
+) -> str:
+    """
+    Leave letter body from templates/leave_<type>.txt.
+    The templates can use the following placeholders:
+      {{student_name}}, {{reason}}, {{from_date}}, {{to_date}}
+    """
+    template = template_registry.get(f"leave_{leave_type.lower()}")
+
+    # If we do not find a template, use a simple generic body.
+    if template is None:
+        return (
+            f"Dear Sir/Madam,\n\n"
+            f"I, {student_name}, request leave from {from_date} to {to_date}.\n"
+            f"Reason: {reason or 'N/A'}.\n\n"
+            f"Thank you.\n"
+        )
+
+    return template.render(
+        {
+            "from_date": from_date,
+            "to_date": to_date,
+            "reason": reason or "",
+            "student_name": student_name,
+        }
+    )
@@ -0,0 +1,273 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import models
+from app.database import async_engine
+from app.config import (
+    LOGIN_FAILURE_CACHE_SECONDS,
+    LOGIN_THROTTLE_BACKEND,
+    LOGIN_THROTTLE_EMAIL_CAPACITY,
+    LOGIN_THROTTLE_EMAIL_REFILL_SECONDS,
+    LOGIN_THROTTLE_IP_CAPACITY,
+    LOGIN_THROTTLE_IP_REFILL_SECONDS,
+)
+
+
+@dataclass(frozen=True)
+class Bucket:
+    capacity: int
+    refill_seconds: float  # time for one token to come back
+
+    def level(self, tokens: float, refilled_at: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - refilled_at) / self.refill_seconds)
+
+    def retry_after(self, level: float) -> float:
+        return 0.0 if level >= 1 else (1 - level) * self.refill_seconds
+
+    @property
+    def full_after(self) -> float:
+        return self.capacity * self.refill_seconds
+
+
+class Throttled(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class InMemoryBuckets:
+    """Buckets of this worker only; fine for a single worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def levels(self, keys: dict[str, Bucket]) -> dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {
+                key: bucket.level(*self._buckets.get(key, (bucket.capacity, now)), now)
+                for key, bucket in keys.items()
+            }
+
+    async def charge(self, keys: dict[str, Bucket]) -> dict[str, float]:
+        now = time.time()
+        levels = {}
+        with self._lock:
+            for key, bucket in keys.items():
+                level = bucket.level(*self._buckets.pop(key, (bucket.capacity, now)), now)
+                levels[key] = max(level - 1, 0.0)
+                self._buckets[key] = (levels[key], now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return levels
+
+
+class PostgresBuckets:
+    """
+    Buckets in the login_throttle_buckets table, shared by every worker.
+    A charge is one upsert per key that refills and takes a token
+    atomically; rows that would be full again are purged now and then.
+    """
+
+    PURGE_EVERY = 500
+
+    def __init__(self, engine=async_engine):
+        self.engine = engine
+        self._charges = 0
+
+    async def levels(self, keys: dict[str, Bucket]) -> dict[str, float]:
+        table = models.LoginThrottleBucket
+        now = time.time()
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                select(table.key, table.tokens, table.refilled_at).where(
+                    table.key.in_(list(keys))
+                )
+            )
+            found = {key: (tokens, refilled_at) for key, tokens, refilled_at in rows}
+
+        return {
+            key: bucket.level(*found.get(key, (bucket.capacity, now)), now)
+            for key, bucket in keys.items()
+        }
+
+    async def charge(self, keys: dict[str, Bucket]) -> dict[str, float]:
+        table = models.LoginThrottleBucket
+        now = time.time()
+        levels = {}
+        async with self.engine.begin() as conn:
+            for key, bucket in keys.items():
+                refilled = func.least(
+                    bucket.capacity,
+                    table.tokens + (now - table.refilled_at) / bucket.refill_seconds,
+                )
+                stmt = (
+                    pg_insert(table)
+                    .values(key=key, tokens=bucket.capacity - 1, refilled_at=now)
+                    .on_conflict_do_update(
+                        index_elements=[table.key],
+                        set_={"tokens": func.greatest(refilled - 1, 0), "refilled_at": now},
+                    )
+                    .returning(table.tokens)
+                )
+                levels[key] = (await conn.execute(stmt)).scalar_one()
+
+            self._charges += 1
+            if self._charges % self.PURGE_EVERY == 0:
+                horizon = max(bucket.full_after for bucket in keys.values())
+                await conn.execute(delete(table).where(table.refilled_at < now - horizon))
+        return levels
+
+
+class _FailedCredentials:
+    """
+    (email, password) pairs that just failed, so retrying the same wrong
+    password is answered without a bcrypt check. Entries are keyed by an
+    HMAC under a per-process random key; no password is kept.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._secret = os.urandom(32)
+        self._entries: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, email: str, password: str) -> tuple:
+        digest = hmac.new(self._secret, password.encode(), hashlib.sha256).digest()
+        return email, digest
+
+    def __contains__(self, pair: tuple) -> bool:
+        key = self._key(*pair)
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, email: str, password: str):
+        key = self._key(email, password)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.monotonic() + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, email: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == email]:
+                del self._entries[key]
+
+
+class LoginThrottle:
+    """
+    Failed sign-ins per email and per client address, as token buckets.
+
+    check() runs before the user lookup: once either bucket is empty the
+    attempt is refused with its retry time, and this worker remembers
+    the block so further attempts do not even reach the backend.
+    failed() takes a token from both buckets. Successful sign-ins cost
+    nothing, so a whole lab behind one address can still log in.
+    """
+
+    def __init__(
+        self,
+        backend,
+        email_bucket: Bucket,
+        ip_bucket: Bucket,
+        failure_ttl: float = LOGIN_FAILURE_CACHE_SECONDS,
+    ):
+        self.backend = backend
+        self.email_bucket = email_bucket
+        self.ip_bucket = ip_bucket
+        self.failures = _FailedCredentials(failure_ttl)
+        self._blocked: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _keys(self, email: str, ip: Optional[str]) -> dict[str, Bucket]:
+        keys = {f"email:{email}": self.email_bucket}
+        if ip:
+            keys[f"ip:{ip}"] = self.ip_bucket
+        return keys
+
+    def _block(self, keys: dict[str, Bucket], levels: dict[str, float]) -> float:
+        now = time.monotonic()
+        retry = 0.0
+        with self._lock:
+            for key, level in levels.items():
+                wait = keys[key].retry_after(level)
+                if wait > 0:
+                    self._blocked[key] = now + wait
+                    self._blocked.move_to_end(key)
+                    retry = max(retry, wait)
+            while len(self._blocked) > 100_000:
+                self._blocked.popitem(last=False)
+        return retry
+
+    def _locally_blocked(self, keys) -> float:
+        now = time.monotonic()
+        with self._lock:
+            waits = [self._blocked.get(key, 0) - now for key in keys]
+        return max(waits, default=0)
+
+    async def check(self, email: str, ip: Optional[str]):
+        """Raise Throttled when this email or address must wait."""
+        email = email.strip().lower()
+        keys = self._keys(email, ip)
+
+        retry = self._locally_blocked(keys)
+        if retry <= 0:
+            retry = self._block(keys, await self.backend.levels(keys))
+
+        if retry > 0:
+            self.rejected += 1
+            raise Throttled(retry)
+
+    def known_failure(self, email: str, password: str) -> bool:
+        return (email.strip().lower(), password) in self.failures
+
+    async def failed(self, email: str, ip: Optional[str], password: Optional[str] = None):
+        email = email.strip().lower()
+        if password is not None:
+            self.failures.add(email, password)
+        keys = self._keys(email, ip)
+        self._block(keys, await self.backend.charge(keys))
+
+    def forget(self, email: str):
+        """Drop cached failures for an email whose credentials changed."""
+        self.failures.forget(email.strip().lower())
+
+    def stats(self) -> dict:
+        with self._lock:
+            blocked = len(self._blocked)
+        return {"blocked_keys": blocked, "rejected": self.rejected}
+
+
+def build_backend(kind: str = LOGIN_THROTTLE_BACKEND):
+    if kind == "postgres":
+        return PostgresBuckets()
+    if kind == "memory":
+        return InMemoryBuckets()
+    raise ValueError(f"Unknown login throttle backend: {kind}")
+
+
+login_throttle = LoginThrottle(
+    build_backend(),
+    email_bucket=Bucket(LOGIN_THROTTLE_EMAIL_CAPACITY, LOGIN_THROTTLE_EMAIL_REFILL_SECONDS),
+    ip_bucket=Bucket(LOGIN_THROTTLE_IP_CAPACITY, LOGIN_THROTTLE_IP_REFILL_SECONDS),
+)
@@ -1,19 +1,131 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
 from app import models
+from sqlalchemy import and_, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 
-def send_system_message(
+def chat_message_payload(msg: models.Message, *, system: bool = False) -> dict:
+    """Websocket event announcing a new chat message to its receiver."""
+    return {
+        "type": "CHAT_MESSAGE",
+        "title": "New message",
+        "message": msg.content,
+        "system": system,
+        "data": {
+            "id": msg.id,
+            "sender_id": msg.sender_id,
+            "receiver_id": msg.receiver_id,
+            "content": msg.content,
+            "link": msg.link,
+            "created_at": msg.created_at.isoformat() if msg.created_at else None,
+        },
+    }
+
+
+@dataclass(frozen=True)
+class SystemMessage:
+    sender_id: int
+    receiver_id: int
+    text: str
+    link: Optional[str] = None
+
+
+async def write_system_messages(
+    *,
+    db: AsyncSession,
+    messages: Sequence[SystemMessage],
+) -> list[models.Message]:
+    """
+    Insert a batch of system messages with one multi-row INSERT.
+
+    Runs in the caller's transaction and does not commit; notify the
+    receivers (chat_message_payload(msg, system=True)) after the commit.
+    Returns the new rows in the order given.
+    """
+    if not messages:
+        return []
+
+    result = await db.scalars(
+        insert(models.Message).returning(
+            models.Message, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "sender_id": m.sender_id,
+                "receiver_id": m.receiver_id,
+                "content": m.text,
+                "link": m.link,
+            }
+            for m in messages
+        ],
+    )
+    return list(result.all())
+
+
+def _position(message_id: int):
+    """(created_at, id) of a message, as a row value for keyset filters."""
+    created_at = (
+        select(models.Message.created_at)
+        .where(models.Message.id == message_id)
+        .scalar_subquery()
+    )
+    return tuple_(created_at, message_id)
+
+
+def fetch_conversation(
     *,
     db: Session,
-    sender_id: int,
-    receiver_id: int,
-    text: str,
+    user_id: int,
+    other_user_id: int,
+    limit: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
 ):
-    msg = models.Message(
-        sender_id=sender_id,
-        receiver_id=receiver_id,
-        content=text,
+    """
+    One page of the conversation between two users, oldest first.
+
+    - no cursor: the latest `limit` messages
+    - before: the `limit` messages preceding that message id
+    - after: the first `limit` messages following that message id
+
+    Returns (messages, has_more), where has_more says whether another
+    page exists in the direction being read.
+    """
+    Message = models.Message
+    position = tuple_(Message.created_at, Message.id)
+
+    query = db.query(Message).filter(
+        or_(
+            and_(
+                Message.sender_id == user_id,
+                Message.receiver_id == other_user_id,
+            ),
+            and_(
+                Message.sender_id == other_user_id,
+                Message.receiver_id == user_id,
+            ),
+        )
     )
 
-    db.add(msg)
-    db.commit()
+    if after is not None:
+        messages = (
+            query.filter(position > _position(after))
+            .order_by(Message.created_at, Message.id)
+            .limit(limit + 1)
+            .all()
+        )
+        return messages[:limit], len(messages) > limit
+
+    if before is not None:
+        query = query.filter(position < _position(before))
+
+    messages = (
+        query.order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(messages) > limit
+    return list(reversed(messages[:limit])), has_more
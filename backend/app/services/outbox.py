@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from app import models
+from app.config import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL_SECONDS
+from app.database import AsyncSessionLocal
+from app.services.message_service import (
+    SystemMessage,
+    chat_message_payload,
+    write_system_messages,
+)
+from app.websocket.notifications import manager
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION = "notification"
+SYSTEM_MESSAGE = "system_message"
+
+
+def queue_notification(db, user_id: int, payload: dict):
+    """
+    Record a websocket notification in the caller's transaction.
+    It is pushed once that transaction commits (see OutboxDispatcher).
+    """
+    db.add(
+        models.OutboxEvent(
+            kind=NOTIFICATION,
+            recipient_id=user_id,
+            payload=payload,
+        )
+    )
+
+
+def queue_system_message(
+    db,
+    *,
+    sender_id: int,
+    receiver_id: int,
+    text: str,
+    link: Optional[str] = None,
+):
+    """
+    Record a system chat message in the caller's transaction.
+    `link` attaches an in-app path to the same message.
+    """
+    db.add(
+        models.OutboxEvent(
+            kind=SYSTEM_MESSAGE,
+            sender_id=sender_id,
+            recipient_id=receiver_id,
+            payload={"text": text, "link": link},
+        )
+    )
+
+
+class OutboxDispatcher:
+    """
+    Background task draining outbox_events.
+
+    Each pass claims a batch of events (FOR UPDATE SKIP LOCKED, so several
+    workers can run it), inserts all system messages with one multi-row
+    INSERT, deletes the events and commits, then pushes the websocket
+    notifications in their original order. Events left behind by a crash
+    are picked up on the next pass.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Ask for a pass now instead of at the next poll."""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                handled = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                handled = 0
+
+            if handled >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        async with self.session_factory() as db:
+            events = (
+                await db.scalars(
+                    select(models.OutboxEvent)
+                    .order_by(models.OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+
+            if not events:
+                return 0
+
+            message_events = [e for e in events if e.kind == SYSTEM_MESSAGE]
+            rows = await write_system_messages(
+                db=db,
+                messages=[
+                    SystemMessage(
+                        sender_id=e.sender_id,
+                        receiver_id=e.recipient_id,
+                        text=e.payload["text"],
+                        link=e.payload.get("link"),
+                    )
+                    for e in message_events
+                ],
+            )
+            messages = {e.id: msg for e, msg in zip(message_events, rows)}
+
+            await db.execute(
+                delete(models.OutboxEvent).where(
+                    models.OutboxEvent.id.in_([e.id for e in events])
+                )
+            )
+            await db.commit()
+
+        for event in events:
+            if event.kind == SYSTEM_MESSAGE:
+                msg = messages[event.id]
+                await manager.notify(
+                    msg.receiver_id, chat_message_payload(msg, system=True)
+                )
+            else:
+                await manager.notify(event.recipient_id, event.payload)
+
+        return len(events)
+
+
+outbox_dispatcher = OutboxDispatcher()
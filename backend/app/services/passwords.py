@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.config import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+    PASSWORD_HASH_WORKERS,
+)
+
+
+class HasherBusy(RuntimeError):
+    """Every worker is busy and the queue is full; retry shortly."""
+
+
+@lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    # min = max = default, so any hash made with a different cost is
+    # reported as needing an update and gets rehashed on the next login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """bcrypt hash in the calling process; runs in the workers."""
+    return _context(rounds).hash(password)
+
+
+def verify_and_update(password: str, hashed: str, rounds: int = BCRYPT_ROUNDS):
+    """(matches, new hash or None); runs in the workers."""
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated process pool, off the request workers.
+
+    At most `max_pending` hashes are queued or running per app worker;
+    further callers wait up to `queue_timeout` seconds for a slot and then
+    get HasherBusy (the API answers 503), so a login burst is shed
+    instead of piling up behind the CPU.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+        rounds: int = BCRYPT_ROUNDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.rounds = rounds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HasherBusy("Too many sign-ins at once, please retry")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(), fn, *args)
+        except BrokenProcessPool:
+            # a worker died; start a fresh pool on the next call
+            self.shutdown()
+            raise
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """
+        (matches, new hash). The new hash is set when the stored one was
+        made with another cost factor and should replace it.
+        """
+        return await self._run(verify_and_update, password, hashed, self.rounds)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher()
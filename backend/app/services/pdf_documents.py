@@ -0,0 +1,168 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import PDF_CACHE_DIR, PDF_FONT_PATH, PDF_RENDER_WORKERS
+from app.services.pdf_render import render_document
+from app.services.storage import key_from_path, storage
+
+
+# Statuses at which a document is final and may be printed
+PRINTABLE = {
+    "leave": {"approved"},
+    "custom": {"approved"},
+    "certificate": {"approved", "delivery_initiated", "collected"},
+}
+
+# Bump when the layout in pdf_render.py changes, so cached files are redrawn
+LAYOUT_VERSION = "1"
+
+
+class NotPrintable(ValueError):
+    pass
+
+
+def _signature_paths(payload: dict) -> set:
+    signs = [payload.get("signature")] + list((payload.get("signatures") or {}).values())
+    return {sign["signature_path"] for sign in signs if sign and sign.get("signature_path")}
+
+
+class PdfRenderer:
+    """
+    Renders documents to PDF in a process pool and keeps the files on disk.
+
+    Files are keyed by (type, id, version), where the version is the ETag
+    of the document's cached /verify payload: any change to the record or
+    to a signer shows up as a new version, and the previous file of that
+    record is deleted once the new one is written. Concurrent requests for
+    the same version share one render.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = PDF_CACHE_DIR,
+        workers: int = PDF_RENDER_WORKERS,
+        font_path: Optional[str] = PDF_FONT_PATH,
+    ):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.font_path = font_path
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.cached = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            # spawn: forking a process with live DB connections and
+            # threads is unsafe, and workers only need fpdf2
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def version_tag(self, version: str) -> str:
+        return hashlib.sha1(f"{LAYOUT_VERSION}|{version}".encode()).hexdigest()[:20]
+
+    def _path(self, kind: str, record_id: int, version: str) -> str:
+        name = f"{self.version_tag(version)}.pdf"
+        return os.path.join(self.cache_dir, kind, str(record_id), name)
+
+    def _write(self, path: str, body: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        temp = f"{path}.{uuid.uuid4().hex}.part"
+        with open(temp, "wb") as handle:
+            handle.write(body)
+        os.replace(temp, path)
+
+        # older versions of the same record
+        for entry in os.scandir(directory):
+            if entry.path != path and entry.name.endswith(".pdf"):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _images(self, payload: dict) -> dict:
+        images = {}
+        for path in _signature_paths(payload):
+            try:
+                images[path] = storage.read(key_from_path(path))
+            except FileNotFoundError:
+                pass
+        return images
+
+    def submit(self, payload: dict, version: str) -> Future:
+        """Future of the cached PDF path for a /verify payload."""
+        kind, record_id = payload["type"], payload["id"]
+        if payload.get("status") not in PRINTABLE[kind]:
+            raise NotPrintable(f"{kind} {record_id} is not approved yet")
+
+        path = self._path(kind, record_id, version)
+        done: Future = Future()
+        if os.path.exists(path):
+            self.cached += 1
+            done.set_result(path)
+            return done
+
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is not None:
+                return pending
+            self._pending[path] = done
+
+        def finished(render: Future):
+            try:
+                self._write(path, render.result())
+                self.rendered += 1
+                done.set_result(path)
+            except BaseException as exc:
+                if isinstance(exc, BrokenProcessPool):
+                    # a worker died; start a fresh pool on the next render
+                    self.shutdown()
+                done.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._pending.pop(path, None)
+
+        try:
+            render = self._executor().submit(
+                render_document, payload, self._images(payload), self.font_path
+            )
+        except BaseException as exc:
+            with self._lock:
+                self._pending.pop(path, None)
+            # callers that joined this render meanwhile wait on `done`
+            done.set_exception(exc)
+            raise
+        render.add_done_callback(finished)
+        return done
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "workers": self.workers,
+            "rendered": self.rendered,
+            "served_from_disk": self.cached,
+            "in_progress": pending,
+        }
+
+
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,303 @@
+import io
+from datetime import datetime
+from typing import Optional
+
+from fpdf import FPDF
+
+
+# PDF layout of approved letters and certificates. This runs in the PDF
+# worker processes, so it imports nothing from the app and gets all it
+# draws (the /verify payload, signature image bytes) as arguments.
+
+LINE = 5.5
+SIGNATURE_HEIGHT = 14
+
+_DESIGNATIONS = {
+    "hod": "Head of Department",
+    "vp": "Vice Principal",
+    "vice_principal": "Vice Principal",
+    "principal": "Principal",
+}
+
+
+class _Letter(FPDF):
+    def __init__(self, font_path: Optional[str]):
+        super().__init__(format="A4")
+        self.set_margins(20, 18, 20)
+        self.set_auto_page_break(True, margin=16)
+        self.unicode_font = bool(font_path)
+        if font_path:
+            self.add_font("Body", "", font_path)
+            self.add_font("Body", "B", font_path)
+            self.body_font = "Body"
+        else:
+            self.body_font = "Helvetica"
+        self.add_page()
+        self.plain()
+
+    def plain(self, size: float = 11):
+        self.set_font(self.body_font, "", size)
+
+    def bold(self, size: float = 11):
+        self.set_font(self.body_font, "B", size)
+
+    def text_of(self, value) -> str:
+        text = "" if value is None else str(value)
+        if self.unicode_font:
+            return text
+        # core fonts only cover latin-1
+        return text.encode("latin-1", "replace").decode("latin-1")
+
+    def line_of(self, value, bold: bool = False, size: float = 11):
+        self.bold(size) if bold else self.plain(size)
+        self.multi_cell(0, LINE, self.text_of(value), new_x="LMARGIN", new_y="NEXT")
+        self.plain()
+
+    def rich(self, *parts):
+        """One paragraph from (text, bold) parts."""
+        for text, bold in parts:
+            self.bold() if bold else self.plain()
+            self.write(LINE, self.text_of(text))
+        self.plain()
+        self.ln(LINE)
+
+    def gap(self, size: float = LINE / 2):
+        self.ln(size)
+
+    def rule(self):
+        y = self.get_y()
+        self.set_draw_color(200, 200, 200)
+        self.line(self.l_margin, y, self.w - self.r_margin, y)
+        self.gap()
+
+
+def _date(value) -> str:
+    if not value:
+        return ""
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%d %b %Y")
+    except ValueError:
+        return str(value)
+
+
+def _title(value) -> str:
+    return str(value or "").replace("_", " ").title()
+
+
+def _from_block(pdf: _Letter, student: dict):
+    pdf.line_of("From", bold=True)
+    pdf.line_of(student.get("name"), bold=True)
+    if student.get("department"):
+        pdf.line_of(f"{student['department']} Department")
+    if student.get("college"):
+        pdf.line_of(student["college"])
+    pdf.gap()
+
+
+def _to_block(pdf: _Letter, recipients: list, college: Optional[str]):
+    pdf.line_of("To", bold=True)
+    for name, designation in recipients:
+        pdf.line_of(name, bold=True)
+        pdf.line_of(designation)
+        if college:
+            pdf.line_of(college)
+        pdf.gap(2)
+    pdf.gap(1)
+
+
+def _opening(pdf: _Letter, student: dict, subject):
+    if subject:
+        pdf.rich(("Sub: ", True), (subject, False))
+        pdf.gap()
+    pdf.line_of("Respected Sir/Madam,")
+    pdf.gap()
+    parts = [("I am ", False), (student.get("name"), True)]
+    if student.get("department"):
+        parts += [(" from the ", False), (student["department"], True), (" department", False)]
+    pdf.rich(*parts, (".", False))
+    pdf.gap()
+
+
+def _closing(pdf: _Letter, student: dict):
+    pdf.line_of("I shall be very grateful for your kind consideration.")
+    pdf.gap(LINE)
+    pdf.line_of("Thanking you,")
+    pdf.line_of("Yours sincerely,")
+    pdf.line_of(student.get("name"), bold=True)
+    pdf.gap()
+
+
+def _signature_block(pdf: _Letter, x: float, width: float, top: float, sign: dict, images: dict):
+    y = top
+    image = images.get(sign.get("signature_path"))
+    if image:
+        pdf.image(
+            io.BytesIO(image),
+            x=x,
+            y=y,
+            w=width,
+            h=SIGNATURE_HEIGHT,
+            keep_aspect_ratio=True,
+        )
+    y += SIGNATURE_HEIGHT + 1
+
+    for text, style, size in (
+        (sign.get("name"), "B", 9),
+        (sign.get("designation"), "", 9),
+        (_date(sign.get("approved_at") or sign.get("acted_at")), "", 8),
+    ):
+        if not text:
+            continue
+        pdf.set_font(pdf.body_font, style, size)
+        pdf.set_xy(x, y)
+        pdf.cell(width, 4.5, pdf.text_of(text))
+        y += 4.5
+    pdf.plain()
+    return y
+
+
+def _signatures(pdf: _Letter, signs: list, images: dict):
+    if not signs:
+        return
+    pdf.rule()
+    pdf.line_of("Approved by", bold=True)
+    pdf.gap(2)
+
+    width = (pdf.w - pdf.l_margin - pdf.r_margin) / len(signs)
+    if pdf.get_y() + SIGNATURE_HEIGHT + 20 > pdf.page_break_trigger:
+        pdf.add_page()
+    top = pdf.get_y()
+    bottom = top
+    for index, sign in enumerate(signs):
+        x = pdf.l_margin + index * width
+        bottom = max(bottom, _signature_block(pdf, x, width - 4, top, sign, images))
+    pdf.set_xy(pdf.l_margin, bottom)
+    pdf.gap()
+
+
+def _footer(pdf: _Letter, payload: dict):
+    pdf.rule()
+    pdf.set_font(pdf.body_font, "", 8)
+    pdf.set_text_color(110, 110, 110)
+    pdf.multi_cell(
+        0,
+        4.5,
+        pdf.text_of(
+            f"Status: {_title(payload.get('status'))}    "
+            f"Reference: {payload['type']}/{payload['id']}"
+        ),
+        new_x="LMARGIN",
+        new_y="NEXT",
+    )
+    pdf.set_text_color(0, 0, 0)
+    pdf.plain()
+
+
+def _leave(pdf: _Letter, payload: dict, images: dict):
+    student = payload.get("student") or {}
+    sign = payload.get("signature")
+    body = payload.get("body") or {}
+
+    _from_block(pdf, student)
+    pdf.line_of(_date(payload.get("created_at")))
+    pdf.gap()
+    if sign:
+        _to_block(
+            pdf,
+            [(sign.get("name"), f"Head of Department, {student.get('department') or ''}")],
+            student.get("college"),
+        )
+    _opening(pdf, student, payload.get("subject"))
+    pdf.rich(
+        ("I kindly request leave from ", False),
+        (_date(body.get("from_date")), True),
+        (" to ", False),
+        (_date(body.get("to_date")), True),
+        (" due to ", False),
+        (body.get("reason") or "valid reason", True),
+        (".", False),
+    )
+    pdf.gap()
+    _closing(pdf, student)
+    _signatures(pdf, [sign] if sign else [], images)
+
+
+def _custom(pdf: _Letter, payload: dict, images: dict):
+    student = payload.get("student") or {}
+    receiver = payload.get("receiver") or {}
+    sign = payload.get("signature")
+    designation = _DESIGNATIONS.get(receiver.get("role"), _title(receiver.get("role")))
+    if sign:
+        sign = {**sign, "designation": designation}
+
+    _from_block(pdf, student)
+    pdf.line_of(_date(payload.get("created_at")))
+    pdf.gap()
+    _to_block(
+        pdf,
+        [(receiver.get("name"), designation)],
+        student.get("college"),
+    )
+    _opening(pdf, student, payload.get("subject"))
+    for paragraph in str(payload.get("content") or "").split("\n"):
+        pdf.line_of(paragraph)
+    pdf.gap()
+    _closing(pdf, student)
+    _signatures(pdf, [sign] if sign else [], images)
+
+
+def _certificate(pdf: _Letter, payload: dict, images: dict):
+    student = payload.get("student") or {}
+    signatures = payload.get("signatures") or {}
+    signs = [
+        {**signatures[role], "designation": _DESIGNATIONS[role]}
+        for role in ("hod", "vp", "principal")
+        if signatures.get(role)
+    ]
+
+    _from_block(pdf, student)
+    pdf.line_of(_date(payload.get("created_at")))
+    pdf.gap()
+    _to_block(
+        pdf,
+        [(sign["name"], sign["designation"]) for sign in signs],
+        student.get("college"),
+    )
+    _opening(pdf, student, "Request for issuance of certificates")
+    pdf.line_of("I kindly request the issuance of the following certificate(s):")
+    for certificate in payload.get("certificates") or []:
+        pdf.rich(("    -  ", False), (certificate.strip(), True))
+    pdf.gap()
+    if payload.get("purpose"):
+        pdf.rich(
+            ("The above certificate(s) are required for ", False),
+            (payload["purpose"], True),
+            (".", False),
+        )
+        pdf.gap()
+    _closing(pdf, student)
+    _signatures(pdf, signs, images)
+
+
+_LAYOUTS = {
+    "leave": ("Leave Letter", _leave),
+    "custom": ("Letter", _custom),
+    "certificate": ("Certificate Request", _certificate),
+}
+
+
+def render_document(payload: dict, images: dict, font_path: Optional[str] = None) -> bytes:
+    """
+    PDF bytes of one document.
+
+    - payload: the document's /verify JSON
+    - images: signature_path -> image bytes for the signatures it shows
+    """
+    title, layout = _LAYOUTS[payload["type"]]
+    pdf = _Letter(font_path)
+    pdf.set_title(title)
+    pdf.line_of(title, bold=True, size=15)
+    pdf.gap(LINE)
+    layout(pdf, payload, images)
+    _footer(pdf, payload)
+    return bytes(pdf.output())
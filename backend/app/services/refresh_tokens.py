@@ -0,0 +1,134 @@
+import itertools
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import jwt
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import JWT_ALGORITHM, JWT_SECRET_KEY, REFRESH_TOKEN_EXPIRE_DAYS
+from app.services.user_cache import UserSnapshot
+
+
+REFRESH_TOKEN_TYPE = "refresh"
+
+# expired sessions are deleted on every Nth sign-in of a worker
+PURGE_EVERY = 200
+
+_issued = itertools.count(1)
+
+
+class InvalidRefreshToken(ValueError):
+    pass
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def _encode(session_id: str, user_id: int, generation: int, expires_at: datetime) -> str:
+    payload = {
+        "sub": str(user_id),
+        "sid": session_id,
+        "gen": generation,
+        "typ": REFRESH_TOKEN_TYPE,
+        "exp": expires_at,
+    }
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def _decode(token: str, verify_exp: bool = True) -> dict:
+    try:
+        payload = jwt.decode(
+            token,
+            JWT_SECRET_KEY,
+            algorithms=[JWT_ALGORITHM],
+            options={"verify_exp": verify_exp},
+        )
+    except jwt.PyJWTError:
+        raise InvalidRefreshToken("Invalid refresh token")
+
+    if payload.get("typ") != REFRESH_TOKEN_TYPE or not payload.get("sid"):
+        raise InvalidRefreshToken("Invalid refresh token")
+    return payload
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """Start a session for a user who just proved their password; caller commits."""
+    expires_at = _expiry()
+    session = models.RefreshSession(
+        id=secrets.token_hex(16),
+        user_id=user_id,
+        generation=0,
+        expires_at=expires_at,
+    )
+    db.add(session)
+
+    if next(_issued) % PURGE_EVERY == 0:
+        await db.execute(
+            delete(models.RefreshSession).where(
+                models.RefreshSession.expires_at < datetime.now(timezone.utc)
+            )
+        )
+    return _encode(session.id, user_id, 0, expires_at)
+
+
+async def rotate_refresh_token(
+    db: AsyncSession, token: str
+) -> Optional[tuple[UserSnapshot, str]]:
+    """
+    (current user, next refresh token), or None once the session is gone.
+
+    The token's generation is checked and bumped, the expiry extended and
+    the user's current profile read in a single UPDATE ... FROM users, so
+    two tabs racing with the same token cannot both win. A token that is
+    valid but no longer current was replayed: the whole session is
+    revoked. Caller commits in both cases.
+    """
+    payload = _decode(token)
+    sessions = models.RefreshSession.__table__
+    users = models.User.__table__
+    session_id, generation = payload["sid"], int(payload.get("gen", 0))
+    now = datetime.now(timezone.utc)
+    expires_at = _expiry()
+
+    row = (
+        await db.execute(
+            update(sessions)
+            .where(
+                sessions.c.id == session_id,
+                sessions.c.generation == generation,
+                sessions.c.expires_at > now,
+                users.c.id == sessions.c.user_id,
+            )
+            .values(generation=generation + 1, expires_at=expires_at)
+            .returning(
+                users.c.id,
+                users.c.name,
+                users.c.email,
+                users.c.role,
+                users.c.college_name,
+                users.c.department_name,
+                users.c.access_status,
+                users.c.signature_path,
+            )
+        )
+    ).first()
+
+    if row is None:
+        await db.execute(delete(sessions).where(sessions.c.id == session_id))
+        return None
+
+    user = UserSnapshot(**row._mapping)
+    return user, _encode(session_id, user.id, generation + 1, expires_at)
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    """End the session of a refresh token, expired or not; caller commits."""
+    payload = _decode(token, verify_exp=False)
+    await db.execute(
+        delete(models.RefreshSession).where(models.RefreshSession.id == payload["sid"])
+    )
+
@@ -0,0 +1,242 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import RENDER_CACHE_FRESH_SECONDS, RENDER_CACHE_MAX_BYTES
+from app.services.http_cache import PUBLIC, etag_matches
+
+
+@dataclass(frozen=True)
+class RenderedDocument:
+    version: str
+    etag: str
+    body: bytes
+
+
+class RenderCache:
+    """
+    LRU of rendered letter / verification payloads, bounded by total size.
+
+    Entries are keyed by (document, type, id) and remember the record
+    version (updated_at, status and the people shown on the document)
+    they were rendered from; the ETag is
+    a hash of the body. Within `fresh_seconds` of being stored or
+    revalidated an entry is served without touching the database; after
+    that the caller compares the version with a primary-key lookup before
+    reusing it. Commits that change a record drop its entries straight
+    away (see the session hooks below).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RENDER_CACHE_MAX_BYTES,
+        fresh_seconds: float = RENDER_CACHE_FRESH_SECONDS,
+    ):
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._entries: OrderedDict[tuple, tuple[float, RenderedDocument]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple[Optional[RenderedDocument], bool]:
+        """(entry, fresh) for `key`; entry is None when nothing is cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            checked_at, doc = entry
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return doc, time.monotonic() - checked_at < self.fresh_seconds
+
+    def put(self, key: tuple, version: str, body: bytes) -> RenderedDocument:
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        doc = RenderedDocument(version=version, etag=f'"{digest}"', body=body)
+
+        with self._lock:
+            self._discard(key)
+            if len(body) > self.max_bytes:
+                return doc
+
+            self._entries[key] = (time.monotonic(), doc)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+        return doc
+
+    def touch(self, key: tuple):
+        """Mark an entry as just revalidated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (time.monotonic(), entry[1])
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1].body)
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+render_cache = RenderCache()
+
+
+def cached_document(
+    key: tuple,
+    current_version: Callable[[], Optional[str]],
+    render: Callable[[], tuple[str, object]],
+) -> RenderedDocument:
+    """
+    Cached JSON rendering of a document, re-rendered when stale.
+
+    - current_version(): the record's version now, or None if it is gone
+    - render(): (version, payload) built from the database
+    """
+    doc, fresh = render_cache.get(key)
+
+    if doc is not None and not fresh:
+        version = current_version()
+        if version is None:
+            render_cache.invalidate(key)
+            doc = None
+        elif version == doc.version:
+            render_cache.touch(key)
+        else:
+            doc = None
+
+    if doc is None:
+        version, payload = render()
+        body = JSONResponse(jsonable_encoder(payload)).body
+        doc = render_cache.put(key, version, body)
+    return doc
+
+
+def serve_cached(
+    request: Request,
+    key: tuple,
+    current_version: Callable[[], Optional[str]],
+    render: Callable[[], tuple[str, object]],
+    policy: str = PUBLIC,
+) -> Response:
+    """
+    Response for a cacheable document (see cached_document).
+
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    doc = cached_document(key, current_version, render)
+
+    headers = {"ETag": doc.etag, "Cache-Control": policy}
+    if etag_matches(request, doc.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(doc.body, media_type="application/json", headers=headers)
+
+
+def record_version(*parts) -> str:
+    return "|".join("" if p is None else str(p) for p in parts)
+
+
+def user_version(user) -> tuple:
+    """
+    Version parts of a user shown on a document, so a signer's new name
+    or signature is seen by every worker's cache, not just the one that
+    committed it.
+    """
+    return tuple(getattr(user, f) if user is not None else None for f in _VERSION_USER_FIELDS)
+
+
+def user_version_columns(user) -> list:
+    """Columns of a (aliased) User giving the same parts as user_version."""
+    return [getattr(user, f) for f in _VERSION_USER_FIELDS]
+
+
+# =========================
+# INVALIDATION
+# =========================
+# Documents rendered from each model; entries are dropped once a commit
+# touching a row of that model goes through.
+_DOCUMENTS = {
+    models.LeaveRequest: [("letter", "leave"), ("verify", "leave")],
+    models.CustomLetterRequest: [("verify", "custom")],
+    models.CertificateRequest: [("verify", "certificate")],
+}
+
+# User fields shown on rendered documents
+_USER_FIELDS = ("name", "department_name", "college_name", "signature_path", "role")
+_VERSION_USER_FIELDS = ("id",) + _USER_FIELDS
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed(session, flush_context):
+    keys = session.info.setdefault("render_cache_keys", set())
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User):
+            state = inspect(obj)
+            if any(state.attrs[f].history.has_changes() for f in _USER_FIELDS):
+                keys.add(None)
+            continue
+
+        for document, kind in _DOCUMENTS.get(type(obj), ()):
+            keys.add((document, kind, obj.id))
+
+
+def note_changed(session, model, ids):
+    """
+    Drop the documents of rows changed by a bulk UPDATE once the session
+    commits. Such statements bypass the flush, so the hook above never
+    sees them.
+    """
+    keys = session.info.setdefault("render_cache_keys", set())
+    for document, kind in _DOCUMENTS.get(model, ()):
+        keys.update((document, kind, record_id) for record_id in ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    keys = session.info.pop("render_cache_keys", None)
+    if not keys:
+        return
+    if None in keys:
+        # A signer's details changed; they may appear on any document
+        render_cache.clear()
+        return
+    for key in keys:
+        render_cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("render_cache_keys", None)
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import ROUTING_CACHE_TTL_SECONDS
+
+
+APPROVER_ROLES = ("hod", "vice_principal", "principal", "superintendent")
+
+
+@dataclass(frozen=True)
+class Approver:
+    id: int
+    name: str
+
+
+@dataclass
+class _Snapshot:
+    # (college, role) -> first approved user with that role in the college
+    by_college: dict = field(default_factory=dict)
+    # (college, department) -> first approved HOD of the department
+    hods: dict = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class RoutingDirectory:
+    """
+    In-process map of (college, department) to its approvers.
+
+    Submissions resolve their HOD / vice principal / principal from here
+    instead of querying the users table. The whole directory is loaded
+    with one query on first use and dropped by `invalidate()` whenever
+    an approval, rejection or college edit changes who the approvers are.
+    """
+
+    def __init__(self, ttl_seconds: float = ROUTING_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        # bumped by invalidate(); a load that started before the bump
+        # may have read old rows and is not kept
+        self._generation = 0
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+
+    def _install(self, snapshot: _Snapshot, generation: int) -> _Snapshot:
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _load(self, db: Session) -> _Snapshot:
+        users = (
+            db.query(
+                models.User.id,
+                models.User.name,
+                models.User.role,
+                models.User.college_name,
+                models.User.department_name,
+            )
+            .filter(
+                models.User.role.in_(APPROVER_ROLES),
+                models.User.access_status == "approved",
+            )
+            .order_by(models.User.id)
+            .all()
+        )
+
+        snapshot = _Snapshot(loaded_at=time.monotonic())
+        for user in users:
+            approver = Approver(id=user.id, name=user.name)
+            snapshot.by_college.setdefault((user.college_name, user.role), approver)
+            if user.role == "hod":
+                snapshot.hods.setdefault(
+                    (user.college_name, user.department_name), approver
+                )
+
+        return snapshot
+
+    def _fresh(self) -> Optional[_Snapshot]:
+        snapshot = self._snapshot
+        if snapshot and time.monotonic() - snapshot.loaded_at < self.ttl_seconds:
+            return snapshot
+        return None
+
+    def _get(self, db: Session) -> _Snapshot:
+        # sync endpoints run on the threadpool, so blocking here is fine
+        snapshot = self._fresh()
+        if snapshot:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._fresh()
+            if snapshot:
+                return snapshot
+            generation = self._generation
+            return self._install(self._load(db), generation)
+
+    async def _aget(self, db: AsyncSession) -> _Snapshot:
+        # Never take the thread lock on the event loop: a second request
+        # would block the loop the first one needs to finish its query.
+        snapshot = self._fresh()
+        if snapshot:
+            return snapshot
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            snapshot = self._fresh()
+            if snapshot:
+                return snapshot
+            generation = self._generation
+            return self._install(await db.run_sync(self._load), generation)
+
+    def hod(self, db: Session, college_name: str, department_name: str) -> Optional[Approver]:
+        return self._get(db).hods.get((college_name, department_name))
+
+    def college_approver(self, db: Session, college_name: str, role: str) -> Optional[Approver]:
+        return self._get(db).by_college.get((college_name, role))
+
+    async def ahod(self, db: AsyncSession, college_name: str, department_name: str) -> Optional[Approver]:
+        snapshot = await self._aget(db)
+        return snapshot.hods.get((college_name, department_name))
+
+    async def acollege_approver(self, db: AsyncSession, college_name: str, role: str) -> Optional[Approver]:
+        snapshot = await self._aget(db)
+        return snapshot.by_college.get((college_name, role))
+
+
+routing_directory = RoutingDirectory()
@@ -0,0 +1,140 @@
+import io
+import os
+import re
+
+from PIL import Image, ImageOps
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import SIGNATURE_MAX_HEIGHT, SIGNATURE_MAX_WIDTH, STORAGE_GC_GRACE_SECONDS
+from app.services import storage as object_storage
+from app.services.storage import derived_keys, key_from_path, storage, store_file
+from app.services.uploads import InvalidUpload, run_io
+
+
+# Storage folders; signatures are "signatures/<sha256>.png", variants
+# "signatures/variants/<source stem>_<variant>.webp"
+SIGNATURE_FOLDER = "signatures"
+VARIANT_FOLDER = "signatures/variants"
+
+# File names a stored signature can have: content-addressed, or the
+# uuid names of uploads made before that
+SIGNATURE_NAME = re.compile(r"[0-9a-f]{64}\.png|[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}\.(png|jpe?g)")
+
+# name -> bounding box (width, height); sized for 2x displays of the
+# h-12 signature on letter / certificate previews
+VARIANTS = {
+    "preview": (480, 96),
+    "thumb": (240, 48),
+}
+
+# Refuse images that would decode to more than this many pixels
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGBA / LA / RGB / L copy of `image`, keeping transparency when present."""
+    if image.mode in ("RGBA", "LA", "RGB", "L"):
+        return image.copy()
+    if "transparency" in image.info or image.mode == "PA":
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def _normalize(path: str) -> str:
+    try:
+        with Image.open(path) as source:
+            # Camera JPEGs are often stored sideways with an EXIF rotation
+            image = _flatten(ImageOps.exif_transpose(source))
+    except (OSError, Image.DecompressionBombError):
+        os.remove(path)
+        raise InvalidUpload("Signature is not a readable PNG or JPG image")
+
+    image.thumbnail((SIGNATURE_MAX_WIDTH, SIGNATURE_MAX_HEIGHT), Image.LANCZOS)
+
+    # Re-encoding writes no EXIF / text chunks, so metadata is dropped
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+
+    stem, _ = os.path.splitext(path)
+    target = f"{stem}.png"
+    temp = f"{target}.part"
+    with open(temp, "wb") as handle:
+        handle.write(buffer.getvalue())
+    os.replace(temp, target)
+
+    if target != path:
+        os.remove(path)
+    return target
+
+
+def _store(path: str) -> str:
+    return store_file(SIGNATURE_FOLDER, _normalize(path), "png")
+
+
+async def store_signature(path: str) -> str:
+    """
+    Downscale a staged signature to SIGNATURE_MAX_WIDTH x SIGNATURE_MAX_HEIGHT,
+    drop its metadata, re-encode it as PNG and move it into storage under
+    its content hash. Returns the path to save on the user.
+    """
+    return await run_io(_store, path)
+
+
+def _variant_keys(key: str) -> list:
+    return derived_keys(key, VARIANT_FOLDER, [f"{name}.webp" for name in VARIANTS])
+
+
+def _variant(path: str, variant: str) -> bytes:
+    key = key_from_path(path)
+    target = derived_keys(key, VARIANT_FOLDER, [f"{variant}.webp"])[0]
+    try:
+        return storage.read(target)
+    except FileNotFoundError:
+        pass
+
+    with Image.open(io.BytesIO(storage.read(key))) as source:
+        image = _flatten(source)
+    image.thumbnail(VARIANTS[variant], Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=85, method=6)
+    storage.put_bytes(target, buffer.getvalue())
+    return buffer.getvalue()
+
+
+async def signature_variant(path: str, variant: str) -> bytes:
+    """
+    WebP bytes of a pre-sized copy of the signature at `path`.
+
+    Stored signatures never change under a given name, so each size is
+    rendered once and kept next to the others in storage.
+    """
+    return await run_io(_variant, path, variant)
+
+
+async def release_signature(db: AsyncSession, path: str):
+    """Drop a replaced signature (and its variants) once no user points at it."""
+    if not path:
+        return
+    in_use = await db.scalar(
+        select(models.User.id).where(models.User.signature_path == path).limit(1)
+    )
+    if in_use is None:
+        await run_io(
+            object_storage.release,
+            path,
+            STORAGE_GC_GRACE_SECONDS,
+            _variant_keys(key_from_path(path)),
+        )
+
+
+def collect_signature_garbage(referenced_paths: set) -> dict:
+    """Remove stored signatures and variants no user references."""
+    return object_storage.collect_garbage(
+        SIGNATURE_FOLDER,
+        referenced_paths,
+        STORAGE_GC_GRACE_SECONDS,
+        derived_folder=VARIANT_FOLDER,
+    )
@@ -0,0 +1,269 @@
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from app.config import (
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_PREFIX,
+    S3_REGION,
+    STORAGE_BACKEND,
+    STORAGE_LOCAL_ROOT,
+)
+
+
+# User.signature_path keeps the "uploads/<key>" form it always had, so
+# existing rows, the /uploads static mount and the frontend still work.
+PATH_PREFIX = "uploads/"
+
+
+def key_from_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    return path[len(PATH_PREFIX):] if path.startswith(PATH_PREFIX) else path
+
+
+def path_from_key(key: str) -> str:
+    return PATH_PREFIX + key
+
+
+def content_key(folder: str, file_path: str, ext: str) -> str:
+    """<folder>/<sha256 of the file>.<ext>"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{folder}/{digest.hexdigest()}.{ext}"
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    modified_at: float  # unix time
+
+
+class LocalStorage:
+    """Objects as files under `root`; keys are relative paths."""
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(self._path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def touch(self, key: str):
+        os.utime(self._path(key))
+
+    def put_file(self, key: str, source_path: str):
+        """Move the finished file at `source_path` in as `key`."""
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(source_path, target)
+        except OSError:
+            # staging dir on another filesystem
+            temp = f"{target}.{uuid.uuid4().hex}.part"
+            shutil.copyfile(source_path, temp)
+            os.replace(temp, target)
+            os.remove(source_path)
+
+    def put_bytes(self, key: str, data: bytes):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp = f"{target}.{uuid.uuid4().hex}.part"
+        with open(temp, "wb") as handle:
+            handle.write(data)
+        os.replace(temp, target)
+
+    def read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as handle:
+            return handle.read()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        base = self._path(prefix)
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if name.endswith(".part"):
+                    continue
+                full = os.path.join(dirpath, name)
+                key = os.path.relpath(full, self.root).replace(os.sep, "/")
+                yield StoredObject(key=key, modified_at=os.stat(full).st_mtime)
+
+
+class S3Storage:
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, ...), so several
+    app nodes share one store. Needs boto3; credentials come from the
+    usual AWS_* environment variables.
+    """
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        prefix: str = S3_PREFIX,
+        region: Optional[str] = S3_REGION,
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _missing(self, exc) -> bool:
+        return exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as exc:
+            if self._missing(exc):
+                return None
+            raise
+        return head["LastModified"].timestamp()
+
+    def touch(self, key: str):
+        # S3 has no utime; copying an object onto itself resets LastModified
+        self._client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+            MetadataDirective="REPLACE",
+        )
+
+    def put_file(self, key: str, source_path: str):
+        self._client.upload_file(source_path, self.bucket, self._key(key))
+        os.remove(source_path)
+
+    def put_bytes(self, key: str, data: bytes):
+        self._client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def read(self, key: str) -> bytes:
+        try:
+            obj = self._client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as exc:
+            if self._missing(exc):
+                raise FileNotFoundError(key)
+            raise
+        return obj["Body"].read()
+
+    def delete(self, key: str):
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield StoredObject(
+                    key=obj["Key"][len(self.prefix):],
+                    modified_at=obj["LastModified"].timestamp(),
+                )
+
+
+def build_storage():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage()
+    return LocalStorage()
+
+
+storage = build_storage()
+
+
+def store_file(folder: str, file_path: str, ext: str) -> str:
+    """
+    Move a finished file into storage under its content hash and return
+    its signature_path-style path. Identical content is stored once.
+    """
+    key = content_key(folder, file_path, ext)
+    if storage.modified_at(key) is None:
+        storage.put_file(key, file_path)
+    else:
+        # Refresh the timestamp so a concurrent release() / GC pass
+        # leaves the object alone until our row is committed
+        storage.touch(key)
+        os.remove(file_path)
+    return path_from_key(key)
+
+
+def derived_keys(key: str, folder: str, names) -> list:
+    """Keys of the "<stem>_<name>.<ext>" copies of `key` kept in `folder`."""
+    stem = os.path.splitext(key.rsplit("/", 1)[-1])[0]
+    return [f"{folder}/{stem}_{name}" for name in names]
+
+
+def release(path: str, grace_seconds: float, derived=()):
+    """
+    Delete the object behind a path no row references any more, along
+    with its `derived` keys, unless it was written or reused within
+    `grace_seconds` (an upload of the same content may be in flight).
+    """
+    key = key_from_path(path)
+    modified = storage.modified_at(key)
+    if modified is None or time.time() - modified < grace_seconds:
+        return False
+    storage.delete(key)
+    for extra in derived:
+        storage.delete(extra)
+    return True
+
+
+def collect_garbage(
+    folder: str,
+    referenced_paths: set,
+    grace_seconds: float,
+    derived_folder: Optional[str] = None,
+) -> dict:
+    """
+    Delete objects in `folder` no row points at any more.
+
+    Objects younger than `grace_seconds` are kept: an upload is stored
+    before the row referencing it is committed. Objects in
+    `derived_folder` (resized variants, named "<stem>_<variant>.<ext>")
+    go with their source.
+    """
+    referenced = {key_from_path(p) for p in referenced_paths if p}
+    live_stems = {os.path.splitext(k.rsplit("/", 1)[-1])[0] for k in referenced}
+    cutoff = time.time() - grace_seconds
+    removed = []
+
+    for obj in storage.list(folder + "/"):
+        if derived_folder and obj.key.startswith(derived_folder + "/"):
+            continue
+        if obj.key not in referenced and obj.modified_at < cutoff:
+            storage.delete(obj.key)
+            removed.append(obj.key)
+
+    if derived_folder:
+        for obj in storage.list(derived_folder + "/"):
+            source_stem = obj.key.rsplit("/", 1)[-1].split("_", 1)[0]
+            if source_stem not in live_stems and obj.modified_at < cutoff:
+                storage.delete(obj.key)
+                removed.append(obj.key)
+
+    return {"removed": len(removed), "keys": removed}
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import UploadFile
+
+from app.config import (
+    SIGNATURE_MAX_BYTES,
+    STORAGE_LOCAL_ROOT,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_IO_WORKERS,
+)
+
+
+# Uploads are written and processed here before they go to storage
+STAGING_DIR = os.path.join(STORAGE_LOCAL_ROOT, "staging")
+
+# Leading bytes of each accepted image type -> stored file extension
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+}
+
+# Disk writes run here so a slow disk never stalls the event loop, and
+# at most UPLOAD_IO_WORKERS uploads hit the disk at once.
+_io_pool = ThreadPoolExecutor(
+    max_workers=UPLOAD_IO_WORKERS,
+    thread_name_prefix="upload-io",
+)
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+class UploadTooLarge(InvalidUpload):
+    pass
+
+
+def sniff_image(head: bytes):
+    """Extension for the image type `head` starts with, or None."""
+    for magic, ext in IMAGE_SIGNATURES.items():
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+async def run_io(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, fn, *args)
+
+
+def _open_temp(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _finish(handle, temp_path: str, final_path: str):
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    os.replace(temp_path, final_path)
+
+
+def _discard(handle, temp_path: str):
+    handle.close()
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_image_upload(
+    upload: UploadFile,
+    *,
+    directory: str = STAGING_DIR,
+    max_bytes: int = SIGNATURE_MAX_BYTES,
+) -> str:
+    """
+    Stream an uploaded PNG/JPEG into `directory` and return its path.
+
+    The body is copied in UPLOAD_CHUNK_SIZE pieces to a temp file in the
+    target directory and renamed into place only once complete, so
+    readers never see a partial image. The type comes from the file's
+    magic bytes (the declared content type and filename are not
+    trusted). Raises UploadTooLarge past `max_bytes` and InvalidUpload
+    for anything that is not a PNG or JPEG.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"File is larger than {max_bytes // 1024} KB")
+
+    head = await upload.read(UPLOAD_CHUNK_SIZE)
+    ext = sniff_image(head)
+    if ext is None:
+        raise InvalidUpload("Only PNG or JPG images are allowed")
+
+    handle, temp_path = await run_io(_open_temp, directory)
+    final_path = os.path.join(directory, f"{uuid.uuid4()}.{ext}")
+
+    try:
+        size = 0
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File is larger than {max_bytes // 1024} KB")
+            await run_io(handle.write, chunk)
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+
+        await run_io(_finish, handle, temp_path, final_path)
+    except BaseException:
+        await run_io(_discard, handle, temp_path)
+        raise
+
+    return final_path
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app import models
+from app.config import USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached, read-only view of the fields endpoints need from a user."""
+
+    id: int
+    name: str
+    email: str
+    role: str
+    college_name: Optional[str] = None
+    department_name: Optional[str] = None
+    access_status: Optional[str] = None
+    signature_path: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            college_name=user.college_name,
+            department_name=user.department_name,
+            access_status=user.access_status,
+            signature_path=user.signature_path,
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> "UserSnapshot":
+        return cls(
+            id=int(payload["sub"]),
+            name=payload.get("name", ""),
+            email=payload.get("email", ""),
+            role=payload.get("role", ""),
+            college_name=payload.get("college_name"),
+            department_name=payload.get("department_name"),
+            access_status=payload.get("access_status"),
+        )
+
+
+class UserSnapshotCache:
+    """
+    Bounded LRU of user snapshots with a short TTL.
+
+    Callers must `invalidate(user_id)` after changing a user's access
+    status, college/department or signature; the TTL only bounds how long
+    another worker can serve the old values.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = USER_CACHE_TTL_SECONDS,
+        max_entries: int = USER_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            stored_at, snapshot = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                del self._entries[user_id]
+                return None
+
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, snapshot: UserSnapshot) -> UserSnapshot:
+        with self._lock:
+            self._entries[snapshot.id] = (time.monotonic(), snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserSnapshotCache()
@@ -0,0 +1,390 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import Integer, String, Text, bindparam, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.services.batch_decisions import DecisionBatch, Notice
+from app.services.render_cache import note_changed
+
+
+class TransitionNotAllowed(ValueError):
+    """The caller's role has no such action on this kind of request."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    action: str
+    source: str
+    target: str
+    # caller role this applies to; None = any role
+    role: Optional[str] = None
+    # request column that must hold the caller's id
+    actor_column: Optional[str] = None
+    # request column set to now()
+    stamp: Optional[str] = None
+    # status recorded on the caller's approval row
+    approval: Optional[str] = None
+    # (role, request column) of the approval opened next
+    next_approver: Optional[tuple] = None
+    # request column of the user notified, and what they are told
+    notify: Optional[str] = None
+    notice: Optional[Notice] = None
+
+
+class Workflow:
+    """
+    States and transitions of one kind of request.
+
+    Each transition is compiled once into a single statement that
+    validates and applies it for a set of ids: an UPDATE of the request
+    guarded by id (primary key), source state and the caller's approver
+    column, with the approval rows written by data-modifying CTEs of the
+    same statement. Ids it did not move are explained by one more query.
+
+    With `approvals_open_ahead` the caller's approval row already exists
+    as "pending" and is updated; otherwise a row is inserted.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        label: str,
+        model,
+        states: tuple,
+        transitions: tuple,
+        status_column: str = "overall_status",
+        approval_model=None,
+        approval_key: Optional[str] = None,
+        approvals_open_ahead: bool = False,
+    ):
+        self.kind = kind
+        self.label = label
+        self.model = model
+        self.states = states
+        self.status_column = status_column
+        self.approval_model = approval_model
+        self.approval_key = approval_key
+        self.approvals_open_ahead = approvals_open_ahead
+
+        self.table: dict[tuple, Transition] = {}
+        self._statements: dict[tuple, object] = {}
+        for transition in transitions:
+            assert transition.source in states and transition.target in states, transition
+            key = (transition.action, transition.role)
+            assert key not in self.table, key
+            self.table[key] = transition
+            self._statements[key] = self._compile(transition)
+
+    def transition(self, action: str, role: str) -> Optional[Transition]:
+        return self.table.get((action, role)) or self.table.get((action, None))
+
+    def _compile(self, transition: Transition):
+        requests = self.model.__table__
+        actor_id = bindparam("actor_id", type_=Integer)
+        values = {self.status_column: transition.target}
+        if transition.stamp:
+            values[transition.stamp] = func.now()
+
+        guard = [
+            requests.c.id.in_(bindparam("ids", expanding=True)),
+            requests.c[self.status_column] == transition.source,
+        ]
+        if transition.actor_column:
+            guard.append(requests.c[transition.actor_column] == actor_id)
+
+        returning = {"id", "student_id"}
+        if transition.notify:
+            returning.add(transition.notify)
+        if transition.next_approver:
+            next_column = transition.next_approver[1]
+            guard.append(requests.c[next_column].isnot(None))
+            returning.add(next_column)
+
+        moved = (
+            update(requests)
+            .where(*guard)
+            .values(**values)
+            .returning(*(requests.c[name] for name in sorted(returning)))
+            .cte("moved")
+        )
+        stmt = select(moved)
+        if self.approval_model is None:
+            return stmt
+
+        approvals = self.approval_model.__table__
+        key = approvals.c[self.approval_key]
+        remarks = bindparam("remarks", type_=Text)
+        if transition.approval and self.approvals_open_ahead:
+            stmt = stmt.add_cte(
+                update(approvals)
+                .where(
+                    key.in_(select(moved.c.id)),
+                    approvals.c.approver_id == actor_id,
+                    approvals.c.status == "pending",
+                )
+                .values(status=transition.approval, remarks=remarks, acted_at=func.now())
+                .cte("acted")
+            )
+        elif transition.approval:
+            stmt = stmt.add_cte(
+                insert(approvals)
+                .from_select(
+                    [key.name, "approver_id", "approver_role", "status", "remarks", "acted_at"],
+                    select(
+                        moved.c.id,
+                        actor_id,
+                        bindparam("actor_role", type_=String),
+                        literal(transition.approval),
+                        remarks,
+                        func.now(),
+                    ),
+                )
+                .cte("acted")
+            )
+
+        if transition.next_approver:
+            next_role, next_column = transition.next_approver
+            stmt = stmt.add_cte(
+                insert(approvals)
+                .from_select(
+                    [key.name, "approver_id", "approver_role", "status"],
+                    select(
+                        moved.c.id,
+                        moved.c[next_column],
+                        literal(next_role),
+                        literal("pending"),
+                    ),
+                )
+                .cte("opened")
+            )
+        return stmt
+
+    async def _explain(self, db: AsyncSession, transition: Transition, actor, ids, batch):
+        requests = self.model.__table__
+        columns = [requests.c.id, requests.c[self.status_column]]
+        if transition.actor_column:
+            columns.append(requests.c[transition.actor_column])
+        if transition.next_approver:
+            columns.append(requests.c[transition.next_approver[1]])
+        found = {
+            row.id: row._mapping
+            for row in await db.execute(select(*columns).where(requests.c.id.in_(ids)))
+        }
+
+        for record_id in ids:
+            row = found.get(record_id)
+            if row is None:
+                batch.fail(record_id, 404, f"{self.label.capitalize()} not found")
+            elif transition.actor_column and row[transition.actor_column] != actor.id:
+                batch.fail(record_id, 403, f"This {self.label} is not assigned to you")
+            elif row[self.status_column] != transition.source:
+                state = row[self.status_column].replace("_", " ")
+                batch.fail(record_id, 400, f"Cannot {transition.action} a {self.label} that is {state}")
+            elif transition.next_approver and row[transition.next_approver[1]] is None:
+                next_role = transition.next_approver[0].replace("_", " ")
+                batch.fail(record_id, 400, f"No {next_role} assigned to this {self.label}")
+            else:
+                # it allowed the move by the time we looked: changed in between
+                batch.fail(record_id, 409, f"This {self.label} was changed concurrently; retry")
+
+    async def apply(
+        self,
+        db: AsyncSession,
+        action: str,
+        actor,
+        batch: DecisionBatch,
+        remarks: Optional[str] = None,
+    ) -> dict:
+        """
+        Move every id of `batch` that allows it; record a result per id
+        and the notifications in `batch`, and `remarks` on the caller's
+        approval rows. Returns {id: returned row} of the requests moved.
+        Caller commits.
+        """
+        transition = self.transition(action, actor.role)
+        if transition is None:
+            raise TransitionNotAllowed(f"You are not allowed to {action} {self.label}s")
+
+        rows = await db.execute(
+            self._statements[(transition.action, transition.role)],
+            {"ids": batch.ids, "actor_id": actor.id, "actor_role": actor.role, "remarks": remarks},
+        )
+        moved = {row.id: row._mapping for row in rows}
+
+        for record_id, row in moved.items():
+            recipient = row[transition.notify] if transition.notify else None
+            batch.done(record_id, transition.target, transition.notice, recipient)
+        if moved:
+            # a bulk UPDATE; the render cache's flush hook does not see it
+            note_changed(db.sync_session, self.model, moved)
+
+        refused = [record_id for record_id in batch.ids if record_id not in moved]
+        if refused:
+            await self._explain(db, transition, actor, refused, batch)
+        return moved
+
+
+# =========================
+# REQUEST KINDS
+# =========================
+
+def _decision_notices(kind: str, title: str, message: str, batch_message: str) -> dict:
+    return {
+        action: Notice(
+            type=f"{kind}_{done.upper()}",
+            title=f"{title} {done.title()}",
+            message=message.format(done=done),
+            batch_title=f"{{count}} {title}s {done.title()}",
+            batch_message=batch_message.format(done=done),
+        )
+        for action, done in (("approve", "approved"), ("reject", "rejected"))
+    }
+
+
+_LEAVE_NOTICES = _decision_notices(
+    "LEAVE",
+    "Leave Request",
+    "Your leave request has been {done} by the HOD",
+    "{{count}} of your leave requests have been {done} by the HOD",
+)
+
+_CUSTOM_LETTER_NOTICES = _decision_notices(
+    "CUSTOM_LETTER",
+    "Custom Letter",
+    "Your custom letter has been {done}",
+    "{{count}} of your custom letters have been {done}",
+)
+
+_CERTIFICATE_FORWARDED = Notice(
+    type="CERTIFICATE_FORWARDED",
+    title="Certificate Request Awaiting Approval",
+    message="{actor} forwarded a certificate request",
+    batch_title="{count} Certificate Requests Awaiting Approval",
+    batch_message="{actor} forwarded {count} certificate requests",
+)
+
+_CERTIFICATE_REJECTED = Notice(
+    type="CERTIFICATE_REJECTED",
+    title="Certificate Request Rejected",
+    message="Your certificate request was rejected",
+    batch_title="{count} Certificate Requests Rejected",
+    batch_message="{count} of your certificate requests were rejected",
+)
+
+
+# in_progress → approved / rejected, decided by the student's HOD
+LEAVE_WORKFLOW = Workflow(
+    kind="leave",
+    label="leave request",
+    model=models.LeaveRequest,
+    states=("draft", "in_progress", "approved", "rejected"),
+    approval_model=models.LeaveApproval,
+    approval_key="leave_id",
+    transitions=tuple(
+        Transition(
+            action=action,
+            source="in_progress",
+            target=target,
+            role="hod",
+            actor_column="hod_id",
+            approval=target,
+            notify="student_id",
+            notice=_LEAVE_NOTICES[action],
+        )
+        for action, target in (("approve", "approved"), ("reject", "rejected"))
+    ),
+)
+
+# submitted → approved / rejected, decided by the addressee
+CUSTOM_LETTER_WORKFLOW = Workflow(
+    kind="custom",
+    label="custom letter",
+    model=models.CustomLetterRequest,
+    status_column="status",
+    states=("draft", "submitted", "approved", "rejected"),
+    transitions=tuple(
+        Transition(
+            action=action,
+            source="submitted",
+            target=target,
+            actor_column="receiver_id",
+            notify="student_id",
+            notice=_CUSTOM_LETTER_NOTICES[action],
+        )
+        for action, target in (("approve", "approved"), ("reject", "rejected"))
+    ),
+)
+
+# (role, request column of that approver, state while it is their turn,
+# timestamp column)
+_CERTIFICATE_CHAIN = (
+    ("hod", "hod_id", "in_progress", "hod_updated_at"),
+    ("vice_principal", "vp_id", "forwarded_to_vp", "vp_updated_at"),
+    ("principal", "principal_id", "forwarded_to_principal", "principal_updated_at"),
+)
+
+
+def _certificate_transitions() -> tuple:
+    transitions = []
+    for step, (role, column, waiting, stamp) in enumerate(_CERTIFICATE_CHAIN):
+        common = dict(role=role, source=waiting, actor_column=column, stamp=stamp)
+        transitions.append(
+            Transition(
+                action="reject",
+                target="rejected",
+                approval="rejected",
+                notify="student_id",
+                notice=_CERTIFICATE_REJECTED,
+                **common,
+            )
+        )
+        if step + 1 < len(_CERTIFICATE_CHAIN):
+            next_role, next_column, next_waiting, _ = _CERTIFICATE_CHAIN[step + 1]
+            transitions.append(
+                Transition(
+                    action="forward",
+                    target=next_waiting,
+                    approval="forwarded",
+                    next_approver=(next_role, next_column),
+                    notify=next_column,
+                    notice=_CERTIFICATE_FORWARDED,
+                    **common,
+                )
+            )
+        else:
+            transitions.append(Transition(action="approve", target="approved", approval="approved", **common))
+
+    # the superintendent's office hands the certificates over
+    transitions += [
+        Transition(action="deliver", source="approved", target="delivery_initiated", role="superintendent"),
+        Transition(action="collect", source="delivery_initiated", target="collected", role="superintendent"),
+    ]
+    return tuple(transitions)
+
+
+# hod → vice_principal → principal → superintendent delivery → collected
+CERTIFICATE_WORKFLOW = Workflow(
+    kind="certificate",
+    label="certificate request",
+    model=models.CertificateRequest,
+    states=(
+        "in_progress",
+        "forwarded_to_vp",
+        "forwarded_to_principal",
+        "approved",
+        "rejected",
+        "delivery_initiated",
+        "collected",
+    ),
+    approval_model=models.CertificateApproval,
+    approval_key="request_id",
+    approvals_open_ahead=True,
+    transitions=_certificate_transitions(),
+)
+
+WORKFLOWS = {
+    workflow.kind: workflow
+    for workflow in (LEAVE_WORKFLOW, CUSTOM_LETTER_WORKFLOW, CERTIFICATE_WORKFLOW)
+}
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (user_id, payload) for every published notification.
+DeliveryHandler = Callable[[int, dict], Awaitable[None]]
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7900
+
+
+def _reference(payload: dict) -> dict:
+    """
+    Stand-in for a payload too large to NOTIFY: the ids and short fields
+    survive, bodies are dropped and `truncated` tells the client to
+    refetch (e.g. the conversation of a long chat message).
+    """
+    reference = {
+        key: value
+        for key, value in payload.items()
+        if key in ("type", "title", "system", "request_id", "link")
+    }
+    reference["message"] = str(payload.get("message") or "")[:200]
+    reference["truncated"] = True
+    if isinstance(payload.get("data"), dict):
+        reference["data"] = {
+            key: value
+            for key, value in payload["data"].items()
+            if key in ("id", "sender_id", "receiver_id", "link", "created_at")
+        }
+        reference["data"]["truncated"] = True
+    return reference
+
+
+class InMemoryBroker:
+    """Single-process broker: publishing delivers straight to this worker."""
+
+    def __init__(self):
+        self._handler: Optional[DeliveryHandler] = None
+
+    def set_handler(self, handler: DeliveryHandler):
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, user_id: int, payload: dict):
+        if self._handler:
+            await self._handler(user_id, payload)
+
+
+class PostgresBroker:
+    """
+    Cross-process broker on Postgres LISTEN/NOTIFY.
+
+    Every worker LISTENs on one channel and delivers each notification to
+    the sockets it holds locally, so a user connected to worker B still
+    receives events raised on worker A. Payloads over Postgres' 8000-byte
+    NOTIFY limit are sent as a reference (see _reference).
+
+    `publish` only enqueues; a background task sends the NOTIFYs, so the
+    request that raised an event never waits on the database for it.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = "reqgo_notifications",
+        max_pending: int = 10000,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self._handler: Optional[DeliveryHandler] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def set_handler(self, handler: DeliveryHandler):
+        self._handler = handler
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+        self._sender = asyncio.create_task(self._send())
+
+    async def stop(self):
+        for task in (self._listener, self._sender):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = None
+        self._sender = None
+
+    async def _connect(self):
+        import psycopg
+
+        return await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+
+    async def _listen(self):
+        retry_delay = 1
+        while True:
+            try:
+                conn = await self._connect()
+                async with conn:
+                    await conn.execute(f'LISTEN "{self.channel}"')
+                    retry_delay = 1
+                    async for notify in conn.notifies():
+                        await self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification listener lost its connection")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+
+    async def _dispatch(self, raw: str):
+        try:
+            message = json.loads(raw)
+            await self._handler(int(message["user_id"]), message["payload"])
+        except Exception:
+            logger.exception("Failed to deliver notification")
+
+    async def publish(self, user_id: int, payload: dict):
+        raw = json.dumps({"user_id": user_id, "payload": payload}, default=str)
+        if len(raw.encode()) > NOTIFY_MAX_BYTES:
+            raw = json.dumps({"user_id": user_id, "payload": _reference(payload)}, default=str)
+            if len(raw.encode()) > NOTIFY_MAX_BYTES:
+                logger.warning("Notification for user %s too large to send; dropped", user_id)
+                return
+        try:
+            self._pending.put_nowait(raw)
+        except asyncio.QueueFull:
+            logger.warning("Notification backlog full; dropping event for user %s", user_id)
+
+    async def _send(self):
+        import psycopg
+
+        conn = None
+        raw = None
+        retry_delay = 1
+        while True:
+            try:
+                if raw is None:
+                    raw = await self._pending.get()
+                if conn is None or conn.closed:
+                    conn = await self._connect()
+                await conn.execute("SELECT pg_notify(%s, %s)", (self.channel, raw))
+                raw = None
+                retry_delay = 1
+            except asyncio.CancelledError:
+                if conn:
+                    await conn.close()
+                raise
+            except psycopg.DataError:
+                # the payload itself is bad; retrying would wedge the queue
+                logger.exception("Dropping notification Postgres refused")
+                raw = None
+            except Exception:
+                logger.exception("Failed to publish notification; retrying")
+                if conn is not None:
+                    try:
+                        await conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
@@ -1,34 +1,156 @@
-from fastapi import WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
+import asyncio
+import logging
+
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 
-from ..database import get_db
 from .. import models
-from ..config import JWT_SECRET_KEY, JWT_ALGORITHM
+from ..config import (
+    JWT_ALGORITHM,
+    JWT_SECRET_KEY,
+    NOTIFICATION_BROKER,
+    NOTIFICATION_OVERFLOW_POLICY,
+    NOTIFICATION_QUEUE_SIZE,
+    NOTIFICATION_SEND_TIMEOUT_SECONDS,
+)
+from ..database import DATABASE_URL
+from ..services.refresh_tokens import REFRESH_TOKEN_TYPE
+from .broker import InMemoryBroker, PostgresBroker
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    """One open socket with a bounded outbound queue and its writer task."""
+
+    def __init__(self, manager: "ConnectionManager", user_id: int, websocket: WebSocket):
+        self.manager = manager
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=manager.queue_size)
+        self.writer = asyncio.create_task(self._drain())
+
+    def enqueue(self, payload: dict):
+        try:
+            self.queue.put_nowait(payload)
+            return
+        except asyncio.QueueFull:
+            pass
 
+        if self.manager.overflow_policy == "close":
+            logger.warning("Closing slow notification socket for user %s", self.user_id)
+            self.manager.drop(self)
+            return
+
+        # drop_oldest
+        self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    async def _drain(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_json(payload),
+                    timeout=self.manager.send_timeout,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # dead, closed or stalled socket
+            self.manager.drop(self)
+
+    async def close(self):
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, WebSocket] = {}
+    """
+    Registry of open notification sockets, several per user (one per
+    tab or device). `notify` goes through the broker so that the worker
+    holding the user's sockets delivers it, whichever worker raised it.
+
+    Delivery only enqueues onto each socket's bounded queue; a writer
+    task per socket does the actual send, so a slow client never delays
+    or fails the request that raised the event.
+    """
+
+    def __init__(
+        self,
+        broker=None,
+        queue_size: int = NOTIFICATION_QUEUE_SIZE,
+        overflow_policy: str = NOTIFICATION_OVERFLOW_POLICY,
+        send_timeout: float = NOTIFICATION_SEND_TIMEOUT_SECONDS,
+    ):
+        self.active_connections: dict[int, dict[WebSocket, _Connection]] = {}
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.broker = broker or InMemoryBroker()
+        self.broker.set_handler(self.deliver_local)
+
+    async def start(self):
+        await self.broker.start()
+
+    async def stop(self):
+        await self.broker.stop()
+        for sockets in list(self.active_connections.values()):
+            for connection in list(sockets.values()):
+                self.drop(connection)
 
     async def connect(self, user_id: int, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        self.active_connections.setdefault(user_id, {})[websocket] = _Connection(
+            self, user_id, websocket
+        )
+
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        sockets = self.active_connections.get(user_id)
+        if not sockets:
+            return
+
+        connection = sockets.pop(websocket, None)
+        if not sockets:
+            del self.active_connections[user_id]
+
+        if connection and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
 
-    def disconnect(self, user_id: int):
-        self.active_connections.pop(user_id, None)
+    def drop(self, connection: _Connection):
+        """Unregister a connection and close its socket in the background."""
+        self.disconnect(connection.user_id, connection.websocket)
+        asyncio.create_task(connection.close())
 
     async def notify(self, user_id: int, payload: dict):
-        websocket = self.active_connections.get(user_id)
-        if websocket:
-            await websocket.send_json(payload)
+        try:
+            await self.broker.publish(user_id, payload)
+        except Exception:
+            logger.exception("Failed to publish notification for user %s", user_id)
 
+    async def deliver_local(self, user_id: int, payload: dict):
+        for connection in list(self.active_connections.get(user_id, {}).values()):
+            connection.enqueue(payload)
 
-manager = ConnectionManager()
 
+def build_broker(kind: str = NOTIFICATION_BROKER):
+    if kind == "postgres":
+        # psycopg wants a plain libpq URL, without SQLAlchemy's driver suffix
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql")
+        return PostgresBroker(dsn.render_as_string(hide_password=False))
+    if kind == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown notification broker: {kind}")
 
-def get_current_user_ws(websocket: WebSocket, db: Session):
+
+manager = ConnectionManager(build_broker())
+
+
+async def get_current_user_ws(websocket: WebSocket, db: AsyncSession):
     token = websocket.query_params.get("token")
     if not token:
         raise WebSocketDisconnect()
@@ -43,7 +165,10 @@ def get_current_user_ws(websocket: WebSocket, db: Session):
     except jwt.PyJWTError:
         raise WebSocketDisconnect()
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    if not user_id or payload.get("typ") == REFRESH_TOKEN_TYPE:
+        raise WebSocketDisconnect()
+
+    user = await db.get(models.User, int(user_id))
     if not user:
         raise WebSocketDisconnect()
 
@@ -0,0 +1,89 @@
+const API = "http://localhost:8000";
+
+let refreshing = null;
+
+// Trade the stored refresh token for a new token pair. Concurrent callers
+// share one request: each refresh token only works once.
+function refreshTokens(fetchImpl) {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem("refresh_token");
+    refreshing = (async () => {
+      if (!refreshToken) return null;
+      const res = await fetchImpl(`${API}/auth/refresh`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      });
+      if (!res.ok) {
+        // another tab may have rotated it first
+        if (localStorage.getItem("refresh_token") !== refreshToken) {
+          return localStorage.getItem("token");
+        }
+        return null;
+      }
+      const data = await res.json();
+      localStorage.setItem("token", data.jwt_token);
+      localStorage.setItem("refresh_token", data.refresh_token);
+      return data.jwt_token;
+    })().finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+}
+
+function withToken(init, token) {
+  const headers = new Headers(init.headers || {});
+  headers.set("Authorization", `Bearer ${token}`);
+  return { ...init, headers };
+}
+
+// Wrap window.fetch so an API call rejected with 401 because the access
+// token expired is retried once with a refreshed token.
+export function installTokenRefresh() {
+  const originalFetch = window.fetch.bind(window);
+
+  window.fetch = async (input, init = {}) => {
+    const res = await originalFetch(input, init);
+    const url = typeof input === "string" ? input : input.url;
+    const sent = new Headers(init.headers || {}).get("Authorization");
+
+    if (res.status !== 401 || !sent || !url.startsWith(API) || url.startsWith(`${API}/auth/`)) {
+      return res;
+    }
+
+    // already refreshed by another request or tab
+    const current = localStorage.getItem("token");
+    if (current && `Bearer ${current}` !== sent) {
+      return originalFetch(input, withToken(init, current));
+    }
+
+    const token = await refreshTokens(originalFetch);
+    if (!token) {
+      clearSession();
+      window.location.assign("/login");
+      return res;
+    }
+    return originalFetch(input, withToken(init, token));
+  };
+}
+
+export function clearSession() {
+  localStorage.removeItem("token");
+  localStorage.removeItem("refresh_token");
+  localStorage.removeItem("user");
+  localStorage.removeItem("Role");
+}
+
+// Revoke this device's session on the server, then forget it locally.
+export function logout() {
+  const refreshToken = localStorage.getItem("refresh_token");
+  clearSession();
+  if (refreshToken) {
+    fetch(`${API}/auth/logout`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    }).catch(() => {});
+  }
+}
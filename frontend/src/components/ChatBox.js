@@ -1,5 +1,5 @@
 import { useSearchParams, useNavigate } from "react-router-dom";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import ChatBubble from "./ChatBubble";
 
 export default function ChatBox() {
@@ -54,21 +54,33 @@ export default function ChatBox() {
 
 
   const [messages, setMessages] = useState([]);
+  const [hasEarlier, setHasEarlier] = useState(false);
   const [input, setInput] = useState("");
 
+  // read by the live-message listener, which is not re-bound per render
+  const messagesRef = useRef(messages);
+  messagesRef.current = messages;
+
   /* ---------------- LOAD MESSAGES ---------------- */
+  // The API returns one page (oldest first); `before` walks back in history.
+  const fetchPage = (params = "") =>
+    fetch(`http://localhost:8000/messages/${receiverId}${params}`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    }).then(async (res) => ({
+      data: await res.json(),
+      hasMore: res.headers.get("X-Has-More") === "true",
+    }));
+
   useEffect(() => {
     if (!receiverId) return;
 
-    fetch(`http://localhost:8000/messages/${receiverId}`, {
-        headers: {
-        Authorization: `Bearer ${token}`,
-        },
-    })
-        .then((res) => res.json())
-        .then((data) => {
+    fetchPage()
+        .then(({ data, hasMore }) => {
         if (Array.isArray(data)) {
             setMessages(data);
+            setHasEarlier(hasMore);
         } else {
             setMessages([]);
         }
@@ -79,6 +91,54 @@ export default function ChatBox() {
         });
     }, [receiverId, token]);
 
+  /* ---------------- LIVE MESSAGES ---------------- */
+  useEffect(() => {
+    if (!receiverId) return;
+
+    const onChatMessage = (event) => {
+      const msg = event.detail;
+      if (String(msg.sender_id) !== String(receiverId)) return;
+
+      // Too large to push in full: load everything newer than the last
+      // stored message we have (or the latest page) instead
+      if (msg.truncated) {
+        const stored = messagesRef.current.filter((m) => !m.pending);
+        const last = stored[stored.length - 1];
+
+        fetchPage(last ? `?after=${last.id}` : "")
+          .then(({ data }) => {
+            if (!Array.isArray(data)) return;
+            setMessages((prev) => [
+              ...prev,
+              ...data.filter((m) => !prev.some((p) => p.id === m.id)),
+            ]);
+          })
+          .catch((err) => console.error("Failed to load messages", err));
+        return;
+      }
+
+      setMessages((prev) =>
+        prev.some((m) => m.id === msg.id) ? prev : [...prev, msg]
+      );
+    };
+
+    window.addEventListener("chat-message", onChatMessage);
+    return () => window.removeEventListener("chat-message", onChatMessage);
+  }, [receiverId]);
+
+  const loadEarlier = () => {
+    if (messages.length === 0) return;
+
+    fetchPage(`?before=${messages[0].id}`)
+      .then(({ data, hasMore }) => {
+        if (Array.isArray(data)) {
+          setMessages((prev) => [...data, ...prev]);
+          setHasEarlier(hasMore);
+        }
+      })
+      .catch((err) => console.error("Failed to load messages", err));
+  };
+
 
   /* ---------------- SEND MESSAGE ---------------- */
   const handleSend = async () => {
@@ -88,6 +148,7 @@ export default function ChatBox() {
       id: Date.now(),
       sender_id: user.id,
       content: input,
+      pending: true,
     };
 
     // Optimistic UI
@@ -110,6 +171,15 @@ export default function ChatBox() {
       if (!res.ok) {
         throw new Error("Message send failed");
       }
+
+      // Swap the optimistic copy for the stored message (real id), unless
+      // a refetch already brought it in.
+      const saved = await res.json();
+      setMessages((prev) =>
+        prev.some((m) => m.id === saved.id)
+          ? prev.filter((m) => m.id !== tempMessage.id)
+          : prev.map((m) => (m.id === tempMessage.id ? saved : m))
+      );
     } catch (err) {
       console.error(err);
     }
@@ -129,6 +199,15 @@ export default function ChatBox() {
 
         {/* MESSAGES */}
         <div className="flex-1 overflow-y-auto p-4 space-y-3 bg-gray-50">
+          {hasEarlier && (
+            <button
+              onClick={loadEarlier}
+              className="block mx-auto text-xs text-gray-500 hover:underline"
+            >
+              Load earlier messages
+            </button>
+          )}
+
           {messages.length === 0 && (
             <p className="text-center text-xs text-gray-400">
               No messages yet
@@ -137,7 +216,9 @@ export default function ChatBox() {
 
           {Array.isArray(messages) &&
             messages.map((msg) => {
-                const meta = getMessageMeta(msg.content);
+                // System messages carry their link separately; older ones
+                // stored it as a message of its own
+                const meta = getMessageMeta(msg.link || msg.content);
 
                 return (
                 <ChatBubble
@@ -13,6 +13,9 @@ export default function ChatBubble({ text, meta, isMe }) {
             : "bg-white text-black"
         }`}
       >
+        {text && !text.startsWith("/") && (
+          <p className="text-sm mb-2">{text}</p>
+        )}
         <p className="text-sm font-bold font-underline mb-1">
           {meta.label}
         </p>
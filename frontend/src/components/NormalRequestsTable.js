@@ -4,30 +4,36 @@ import { useNavigate } from "react-router-dom";
 export default function NormalRequestsTable() {
   const [requests, setRequests] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
   const navigate = useNavigate();
   
 
-  useEffect(() => {
-    const fetchRequests = async () => {
-      const token = localStorage.getItem("token");
+  const fetchRequests = async (cursor = null) => {
+    const token = localStorage.getItem("token");
+    const url = cursor
+      ? `http://localhost:8000/requests?cursor=${encodeURIComponent(cursor)}`
+      : "http://localhost:8000/requests";
 
-      try {
-        const res = await fetch("http://localhost:8000/requests", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
+    try {
+      const res = await fetch(url, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
 
-        const data = await res.json();
-        setRequests(Array.isArray(data) ? data : []);
-      } catch (err) {
-        console.error("Failed to load requests", err);
-        setRequests([]);
-      } finally {
-        setLoading(false);
-      }
-    };
+      const data = await res.json();
+      const page = Array.isArray(data) ? data : [];
+      setRequests((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
+    } catch (err) {
+      console.error("Failed to load requests", err);
+      if (!cursor) setRequests([]);
+    } finally {
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     fetchRequests();
   }, []);
 
@@ -107,6 +113,16 @@ export default function NormalRequestsTable() {
               ))}
           </tbody>
         </table>
+        {!loading && nextCursor && (
+          <div className="px-6 py-4 text-center border-t">
+            <button
+              onClick={() => fetchRequests(nextCursor)}
+              className="px-4 py-1.5 rounded-md bg-primary-gradient text-black text-xs hover:opacity-90 transition"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -26,6 +26,14 @@ export default function useNotifications(user) {
       try {
         const data = JSON.parse(event.data);
 
+        // Chat messages are handed to any open ChatBox to append in place.
+        if (data.type === "CHAT_MESSAGE") {
+          window.dispatchEvent(
+            new CustomEvent("chat-message", { detail: data.data })
+          );
+          if (data.system) return;
+        }
+
         if (Notification.permission === "granted") {
           new Notification(data.title || "Notification", {
             body: data.message || "",
@@ -7,6 +7,7 @@ import EditCollegeDetails from "../components/EditCollegeDetails";
 import NormalRequestsTable from "../components/NormalRequestsTable";
 import StudentRequestsTable from "../components/StudentRequestsTable";
 import useNotifications from "../hooks/useNotifications";
+import { logout } from "../auth";
 
 export default function Dashboard() {
   const [activeView, setActiveView] = useState("requests");
@@ -28,9 +29,7 @@ export default function Dashboard() {
 
   // ✅ Stable logout
   const handleLogout = useCallback(() => {
-    localStorage.removeItem("token");
-    localStorage.removeItem("user");
-    localStorage.removeItem("Role");
+    logout();
     navigate("/login");
   }, [navigate]);
 
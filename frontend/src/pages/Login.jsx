@@ -41,6 +41,7 @@ export default function Login() {
       }
 
       localStorage.setItem("token", data.jwt_token);
+      localStorage.setItem("refresh_token", data.refresh_token);
       localStorage.setItem("user", JSON.stringify(data.user));
 
       navigate("/dashboard");
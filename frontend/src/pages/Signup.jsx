@@ -95,6 +95,7 @@ const departments = [
     }
 
     localStorage.setItem("token", data.jwt_token);
+    localStorage.setItem("refresh_token", data.refresh_token);
     localStorage.setItem("user", JSON.stringify(data.user));
 
     setShowSuccessModal(true);
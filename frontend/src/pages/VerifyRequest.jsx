@@ -13,6 +13,9 @@ export default function VerifyRequest() {
   const [error, setError] = useState("");
 
   const normalizePath = (p) => p?.replaceAll("\\", "/");
+  // Small WebP rendition sized for the letter preview
+  const signatureUrl = (p) =>
+    `http://localhost:8000/signatures/preview/${normalizePath(p).split("/").pop()}`;
 
   useEffect(() => {
     if (!letter_type || !id) return;
@@ -38,9 +41,7 @@ export default function VerifyRequest() {
                   designation: resData.signature.designation,
                   approvedAt: resData.signature.approved_at,
                   image: resData.signature.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.signature.signature_path
-                      )}`
+                    ? signatureUrl(resData.signature.signature_path)
                     : null,
                 }
               : null,
@@ -61,9 +62,7 @@ export default function VerifyRequest() {
                   designation: resData.signature.designation,
                   approvedAt: resData.signature.approved_at,
                   image: resData.signature.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.signature.signature_path
-                      )}`
+                    ? signatureUrl(resData.signature.signature_path)
                     : null,
                 }
               : null,
@@ -93,9 +92,7 @@ export default function VerifyRequest() {
                   designation: "Head of Department",
                   approvedAt: resData.signatures.hod.acted_at,
                   image: resData.signatures.hod.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.signatures.hod.signature_path
-                      )}`
+                    ? signatureUrl(resData.signatures.hod.signature_path)
                     : null,
                 }
               : null,
@@ -106,9 +103,7 @@ export default function VerifyRequest() {
                   designation: "Vice Principal",
                   approvedAt: resData.signatures.vp.acted_at,
                   image: resData.signatures.vp.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.signatures.vp.signature_path
-                      )}`
+                    ? signatureUrl(resData.signatures.vp.signature_path)
                     : null,
                 }
               : null,
@@ -119,9 +114,7 @@ export default function VerifyRequest() {
                   designation: "Principal",
                   approvedAt: resData.signatures.principal.acted_at,
                   image: resData.signatures.principal.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.signatures.principal.signature_path
-                      )}`
+                    ? signatureUrl(resData.signatures.principal.signature_path)
                     : null,
                 }
               : null,
@@ -38,6 +38,9 @@ export default function ViewRequest() {
   "request";
   const filename = `${studentName}_${requestType}_request.pdf`;
   const normalizePath = (p) => p?.replaceAll("\\", "/");
+  // Small WebP rendition sized for the letter preview
+  const signatureUrl = (p) =>
+    `http://localhost:8000/signatures/preview/${normalizePath(p).split("/").pop()}`;
 
 
   
@@ -160,7 +163,7 @@ export default function ViewRequest() {
               designation: "Head of Department",
               approvedAt: resData.updated_at,
               image: resData.hod?.signature_path
-                ? `http://localhost:8000/${resData.hod.signature_path}`
+                ? signatureUrl(resData.hod.signature_path)
                 : null,
             }
           : null,
@@ -216,7 +219,7 @@ export default function ViewRequest() {
                       designation: `HOD, ${resData.student?.department_name}`,
                       approvedAt: resData.hod_updated_at || null,
                       image: resData.hod?.signature_path
-                        ? `http://localhost:8000/${resData.hod.signature_path}`
+                        ? signatureUrl(resData.hod.signature_path)
                         : null,
                     }
                   : null,
@@ -227,7 +230,7 @@ export default function ViewRequest() {
                       designation: "Vice Principal",
                       approvedAt: resData.vp_updated_at || null,
                       image: resData.vp?.signature_path
-                        ? `http://localhost:8000/${resData.vp.signature_path}`
+                        ? signatureUrl(resData.vp.signature_path)
                         : null,
                     }
                   : null,
@@ -240,7 +243,7 @@ export default function ViewRequest() {
                       designation: "Principal",
                       approvedAt: resData.principal_updated_at || null,
                       image: resData.principal?.signature_path
-                        ? `http://localhost:8000/${resData.principal.signature_path}`
+                        ? signatureUrl(resData.principal.signature_path)
                         : null,
                     }
                   : null,
@@ -282,9 +285,7 @@ export default function ViewRequest() {
                   designation: resData.receiver?.role,
                   approvedAt: resData.updated_at,
                   image: resData.receiver?.signature_path
-                    ? `http://localhost:8000/${normalizePath(
-                        resData.receiver.signature_path
-                      )}`
+                    ? signatureUrl(resData.receiver.signature_path)
                     : null,
                 }
               : null,
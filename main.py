@@ -3,6 +3,7 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 import os
+import re
 
 # IMPORT YOUR EXISTING SETUP
 from database import SessionLocal
@@ -24,6 +25,25 @@ def get_db():
 # ---------------- LEAVE TEMPLATE LOADER ----------------
 # ✅ THIS IS THE NEW PART YOU ASKED FOR
 
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# path -> (mtime, [text, name, text, name, ..., text])
+_compiled_templates = {}
+
+
+def _compiled_template(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _compiled_templates.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r") as f:
+        segments = _PLACEHOLDER.split(f.read())
+
+    _compiled_templates[path] = (mtime, segments)
+    return segments
+
+
 def load_leave_template(leave_type, from_date, to_date):
     file_map = {
         "medical": "templates/leave_medical.txt",
@@ -33,14 +53,20 @@ def load_leave_template(leave_type, from_date, to_date):
     }
 
     path = file_map.get(leave_type.lower())
-    if not path or not os.path.exists(path):
+    if not path:
         return "Leave letter template not found."
 
-    with open(path, "r") as f:
-        content = f.read()
+    try:
+        segments = _compiled_template(path)
+    except FileNotFoundError:
+        return "Leave letter template not found."
 
-    return content.replace("{{from_date}}", from_date)\
-                  .replace("{{to_date}}", to_date)
+    # Parsed once per file version; fill placeholders in one pass
+    values = {"from_date": from_date, "to_date": to_date}
+    parts = list(segments)
+    for i in range(1, len(parts), 2):
+        parts[i] = values.get(parts[i], "{{%s}}" % parts[i])
+    return "".join(parts)
 
 # ---------------- HOME ----------------
 